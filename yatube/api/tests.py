@@ -0,0 +1,71 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='JustName')
+        cls.reader = User.objects.create_user(username='AnotherName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Текст тестового поста',
+            author=cls.user,
+            group=cls.group,
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(ApiTests.reader)
+        cache.clear()
+
+    def test_feeds_return_posts(self):
+        """Ленты API отдают посты в JSON."""
+        urls = [
+            reverse('api:index'),
+            reverse('api:group_list', kwargs={'slug': 'test_group'}),
+            reverse('api:profile', kwargs={'username': 'JustName'}),
+            reverse('api:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                results = response.json()['results']
+                self.assertEqual(results[0]['id'], ApiTests.post.id)
+                self.assertEqual(results[0]['group'], 'test_group')
+
+    def test_follow_requires_login(self):
+        response = self.guest_client.get(reverse('api:follow_index'))
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+
+    def test_post_detail_conditional_get(self):
+        """Неизмененный пост отдается как 304, комментарий меняет ETag."""
+        url = reverse('api:post_detail', kwargs={'post_id': ApiTests.post.id})
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json()['comments']['results'], [])
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertNotIn('Last-Modified', response)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Comment.objects.create(
+            post=ApiTests.post, author=ApiTests.reader, text='Комментарий'
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,156 @@
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET
+from posts import caching, feeds
+from posts.caching import newest
+from posts.models import Comment, Group, Post, TimelineEntry, User
+from posts.paginators import CursorPaginator
+
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def serialize_post(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'created': post.created.isoformat(),
+        'author': post.author.username if post.author_id else None,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+    }
+
+
+def serialize_comment(comment):
+    return {
+        'id': comment.pk,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+        'author': comment.author.username,
+    }
+
+
+def serialize_page(request, queryset, serializer, per_page,
+                   key=('created', 'pk')):
+    page = CursorPaginator(queryset, per_page, key).get_page(
+        request.GET.get('cursor')
+    )
+    return {
+        'results': [serializer(obj) for obj in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def conditional(get_scopes, get_newest):
+    def decorator(view):
+        return require_GET(caching.conditional(get_scopes, get_newest)(view))
+    return decorator
+
+
+def json_response(data):
+    return JsonResponse(data, json_dumps_params=JSON_PARAMS)
+
+
+def api_login_required(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'detail': 'Требуется авторизация.'},
+                status=401,
+                json_dumps_params=JSON_PARAMS,
+            )
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@conditional(
+    lambda request: [caching.FEED],
+    lambda request: newest(Post.objects.all()),
+)
+def index(request):
+    return json_response(serialize_page(
+        request,
+        feeds.index_posts(),
+        serialize_post,
+        settings.PAGINATOR_CONST,
+    ))
+
+
+@conditional(
+    lambda request, slug: [caching.group_scope(slug)],
+    lambda request, slug: newest(Post.objects.filter(group__slug=slug)),
+)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return json_response(serialize_page(
+        request,
+        feeds.group_posts(group).select_related('group'),
+        serialize_post,
+        settings.PAGINATOR_CONST,
+    ))
+
+
+@conditional(
+    lambda request, username: [caching.author_scope(username)],
+    lambda request, username: newest(
+        Post.objects.filter(author__username=username)
+    ),
+)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return json_response(serialize_page(
+        request,
+        feeds.author_posts(author).select_related('author'),
+        serialize_post,
+        settings.PAGINATOR_CONST,
+    ))
+
+
+@api_login_required
+@conditional(
+    lambda request: [
+        caching.FEED, caching.timeline_scope(request.user.pk)
+    ],
+    lambda request: newest(
+        TimelineEntry.objects.filter(user=request.user)
+    ),
+)
+def follow_index(request):
+    return json_response(serialize_page(
+        request,
+        feeds.follow_posts(request.user),
+        serialize_post,
+        settings.PAGINATOR_CONST,
+        feeds.FOLLOW_KEY,
+    ))
+
+
+def post_newest(request, post_id):
+    dates = [
+        newest(Post.objects.filter(pk=post_id)),
+        newest(Comment.objects.filter(post_id=post_id)),
+    ]
+    return max(filter(None, dates), default=None)
+
+
+@conditional(
+    lambda request, post_id: [caching.post_scope(post_id)],
+    post_newest,
+)
+def post_detail(request, post_id):
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id
+    )
+    data = serialize_post(post)
+    data['comments'] = serialize_page(
+        request,
+        feeds.post_comments(post_id),
+        serialize_comment,
+        settings.COMMENTS_PAGE_SIZE,
+    )
+    return json_response(data)
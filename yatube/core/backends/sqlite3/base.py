@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite, который открывает транзакции atomic() через BEGIN IMMEDIATE.
+    Блокировка на запись берется сразу, поэтому писатель ждет busy_timeout,
+    а не падает с "database is locked" при повышении блокировки.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        if settings.SQLITE_IMMEDIATE_TRANSACTIONS:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        else:
+            super()._start_transaction_under_autocommit()
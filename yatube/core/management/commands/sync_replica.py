@@ -0,0 +1,30 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файл реплики через backup API. '
+        'Нужна для локальной проверки чтения с реплик.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='replica')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections.databases:
+            raise CommandError(f'Нет базы {alias} в DATABASES')
+        source, target = connections['default'], connections[alias]
+        if 'sqlite' not in target.settings_dict['ENGINE']:
+            raise CommandError('Копирование поддерживается только для SQLite')
+        target.close()
+        source.ensure_connection()
+        replica = sqlite3.connect(target.settings_dict['NAME'])
+        try:
+            source.connection.backup(replica)
+        finally:
+            replica.close()
+        self.stdout.write(f'Реплика {alias} обновлена')
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_local = threading.local()
+_lock = threading.Lock()
+
+
+class RequestTimer:
+    """Накопитель времени БД и шаблонов в пределах одного запроса."""
+
+    def __init__(self):
+        self.db = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self._template_depth = 0
+
+    def db_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    @contextmanager
+    def template_timer(self):
+        # Вложенный рендер уже учтен во внешнем.
+        self._template_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._template_depth -= 1
+            if not self._template_depth:
+                self.template += time.perf_counter() - started
+
+
+def current_timer():
+    return getattr(_local, 'timer', None)
+
+
+@contextmanager
+def request_timer():
+    timer = _local.timer = RequestTimer()
+    try:
+        yield timer
+    finally:
+        _local.timer = None
+
+
+class Histogram:
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+
+
+class ViewMetrics:
+
+    def __init__(self):
+        self.wall = Histogram()
+        self.db = Histogram()
+        self.template = Histogram()
+        self.queries = 0
+        self.cache = defaultdict(int)
+
+
+_views = defaultdict(ViewMetrics)
+
+
+def observe(view_name, wall, timer, cache_status):
+    with _lock:
+        metrics = _views[view_name]
+        metrics.wall.observe(wall)
+        metrics.db.observe(timer.db)
+        metrics.template.observe(timer.template)
+        metrics.queries += timer.queries
+        if cache_status:
+            metrics.cache[cache_status] += 1
+
+
+def reset():
+    with _lock:
+        _views.clear()
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+
+def render_histogram(lines, name, view, histogram):
+    label = f'view="{escape_label(view)}"'
+    for bound, count in zip(BUCKETS, histogram.buckets):
+        lines.append(f'{name}_bucket{{{label},le="{bound}"}} {count}')
+    lines.append(f'{name}_bucket{{{label},le="+Inf"}} {histogram.count}')
+    lines.append(f'{name}_sum{{{label}}} {histogram.sum:.6f}')
+    lines.append(f'{name}_count{{{label}}} {histogram.count}')
+
+
+HISTOGRAMS = (
+    ('yatube_view_duration_seconds', 'wall', 'Полное время ответа'),
+    ('yatube_view_db_seconds', 'db', 'Время запросов к БД'),
+    ('yatube_view_template_seconds', 'template', 'Время рендера шаблонов'),
+)
+
+
+def render_prometheus():
+    """Метрики в текстовом формате Prometheus 0.0.4."""
+    with _lock:
+        snapshot = sorted(_views.items())
+        lines = []
+        for name, attr, description in HISTOGRAMS:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} histogram')
+            for view, metrics in snapshot:
+                render_histogram(lines, name, view, getattr(metrics, attr))
+        lines.append('# HELP yatube_view_queries_total Запросов к БД')
+        lines.append('# TYPE yatube_view_queries_total counter')
+        for view, metrics in snapshot:
+            lines.append(
+                f'yatube_view_queries_total{{view="{escape_label(view)}"}} '
+                f'{metrics.queries}'
+            )
+        lines.append('# HELP yatube_view_cache_total Попадания в кэш страниц')
+        lines.append('# TYPE yatube_view_cache_total counter')
+        for view, metrics in snapshot:
+            for status, count in sorted(metrics.cache.items()):
+                lines.append(
+                    'yatube_view_cache_total'
+                    f'{{view="{escape_label(view)}",result="{status}"}} '
+                    f'{count}'
+                )
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,67 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from . import metrics, routers
+
+
+def cache_status(request):
+    # CacheMiddleware из cache_page помечает запрос: False — ответ взят
+    # из кэша, True — страница рендерилась и будет сохранена.
+    update_cache = getattr(request, '_cache_update_cache', None)
+    if update_cache is None:
+        return None
+    return 'miss' if update_cache else 'hit'
+
+
+class InstrumentationMiddleware:
+    """
+    Меряет время ответа, БД и шаблонов для каждого представления,
+    отдает их в заголовке Server-Timing и копит гистограммы для /metrics.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        with metrics.request_timer() as timer, ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(timer.db_wrapper)
+                )
+            response = self.get_response(request)
+        wall = time.perf_counter() - started
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else 'unresolved'
+        status = cache_status(request)
+        metrics.observe(view_name, wall, timer, status)
+        timings = [
+            f'total;dur={wall * 1000:.1f}',
+            f'db;dur={timer.db * 1000:.1f};desc="{timer.queries} queries"',
+            f'tpl;dur={timer.template * 1000:.1f}',
+        ]
+        if status:
+            timings.append(f'cache;desc={status}')
+        response['Server-Timing'] = ', '.join(timings)
+        return response
+
+
+class StickyPrimaryMiddleware:
+    """
+    После успешной записи запоминает в сессии окно, в котором
+    чтения этой сессии не уходят на отстающие реплики.
+    Должен стоять после SessionMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (request.method not in routers.SAFE_METHODS
+                and response.status_code < 400
+                and hasattr(request, 'session')):
+            routers.mark_write(request)
+        return response
@@ -0,0 +1,77 @@
+import random
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+PRIMARY = 'default'
+STICKY_SESSION_KEY = '_primary_until'
+SAFE_METHODS = ('GET', 'HEAD')
+
+_state = threading.local()
+
+
+@contextmanager
+def use_replicas():
+    """Чтения внутри блока уходят на реплики из DATABASE_REPLICAS."""
+    previous = getattr(_state, 'replicas', False)
+    _state.replicas = True
+    try:
+        yield
+    finally:
+        _state.replicas = previous
+
+
+def reading_replicas():
+    """Чтения текущего потока сейчас уходят на реплики."""
+    return bool(settings.DATABASE_REPLICAS) and getattr(
+        _state, 'replicas', False
+    )
+
+
+def recently_wrote(request):
+    """Сессия недавно писала: ее чтения держим на основной базе."""
+    session = getattr(request, 'session', None)
+    if session is None:
+        return False
+    return session.get(STICKY_SESSION_KEY, 0) > time.time()
+
+
+def mark_write(request):
+    request.session[STICKY_SESSION_KEY] = (
+        time.time() + settings.REPLICA_STICKY_SECONDS
+    )
+
+
+def replica_reads(view):
+    """
+    Разрешает представлению читать с реплик. Запросы с записью
+    и запросы сессии сразу после записи остаются на основной базе.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS or recently_wrote(request):
+            return view(request, *args, **kwargs)
+        with use_replicas():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    """Запись всегда в основную базу, чтение — по флагу use_replicas."""
+
+    def db_for_read(self, model, **hints):
+        if reading_replicas():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
@@ -0,0 +1,51 @@
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CONTENT_NAME = re.compile(r'^[0-9a-f]{64}')
+
+
+def is_content_addressed(name):
+    """Имя уже начинается с хэша: исходник или копия, производная от него."""
+    return bool(CONTENT_NAME.match(posixpath.basename(name)))
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Называет файлы по SHA-256 содержимого и раскладывает их по каталогам
+    ab/cd/, чтобы ни один каталог не разрастался. Одинаковые загрузки
+    хранятся один раз: повторное сохранение возвращает уже лежащий файл.
+    """
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, basename = posixpath.split(name)
+        extension = posixpath.splitext(basename)[1].lower()
+        value = digest.hexdigest()
+        return posixpath.join(
+            directory, value[:2], value[2:4], f'{value}{extension}'
+        )
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        if not is_content_addressed(name):
+            name = self.content_name(name, content)
+        if self.exists(name):
+            # Свежая дата изменения говорит images.release, что файл
+            # только что загрузили снова и удалять его рано.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
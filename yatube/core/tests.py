@@ -0,0 +1,242 @@
+import asyncio
+import shutil
+import tempfile
+import time
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.wsgi import get_wsgi_application
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from posts import caching
+from posts.models import Post
+
+from . import metrics, routers, throttling
+from .asgi import ASGIHandler, build_environ
+from .storage import ContentAddressedStorage
+from .views import media_view
+
+User = get_user_model()
+
+
+class InstrumentationTests(TestCase):
+
+    def setUp(self):
+        self.guest_client = Client()
+        metrics.reset()
+        cache.clear()
+
+    def test_server_timing_and_metrics(self):
+        """Ответы несут Server-Timing, а /metrics отдает гистограммы."""
+        response = self.guest_client.get('/')
+        self.assertIn('cache;desc=miss', response['Server-Timing'])
+        self.assertIn('db;dur=', response['Server-Timing'])
+        response = self.guest_client.get('/')
+        self.assertIn('cache;desc=hit', response['Server-Timing'])
+        response = self.guest_client.get('/metrics/')
+        body = response.content.decode()
+        self.assertIn(
+            'yatube_view_duration_seconds_count{view="posts:index"} 2', body
+        )
+        self.assertIn(
+            'yatube_view_cache_total{view="posts:index",result="hit"} 1', body
+        )
+
+    def test_metrics_hidden_from_other_hosts(self):
+        response = self.guest_client.get(
+            '/metrics/', REMOTE_ADDR='10.0.0.1'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class RoutingTests(TestCase):
+
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+
+    def test_reads_use_replicas_only_when_allowed(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        with routers.use_replicas():
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+
+    def test_session_sticks_to_primary_after_write(self):
+        """После записи сессия читает с основной базы до конца окна."""
+        @routers.replica_reads
+        def view(request):
+            return HttpResponse(self.router.db_for_read(Post))
+
+        request = RequestFactory().get('/')
+        request.session = {}
+        self.assertEqual(view(request).content, b'replica')
+        client = Client()
+        client.force_login(User.objects.create_user(username='writer'))
+        client.post(reverse('posts:post_create'), {'text': 'Новый пост'})
+        request.session = client.session
+        self.assertGreater(
+            request.session[routers.STICKY_SESSION_KEY], time.time()
+        )
+        self.assertEqual(view(request).content, b'default')
+
+    def test_replica_page_not_cached_right_after_write(self):
+        """Страница с реплики сразу после записи в область не кэшируется."""
+        rendered = []
+
+        @caching.cache_versioned(lambda: [caching.FEED])
+        def view(request):
+            rendered.append(request)
+            return HttpResponse('лента')
+
+        def get():
+            request = RequestFactory().get('/feed/')
+            request.user = AnonymousUser()
+            with routers.use_replicas():
+                view(request)
+
+        cache.clear()
+        caching.bump(caching.FEED)
+        get()
+        get()
+        self.assertEqual(len(rendered), 2)
+        cache.delete(caching.bumped_key(caching.FEED))
+        get()
+        get()
+        self.assertEqual(len(rendered), 3)
+
+
+@override_settings(THROTTLE_RATES={'add_comment': '2/m'})
+class ThrottlingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='writer')
+        self.post = Post.objects.create(text='Пост', author=self.user)
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse('posts:add_comment', args=[self.post.pk])
+
+    def test_burst_gets_429_with_retry_after(self):
+        for _ in range(2):
+            response = self.client.post(self.url, {'text': 'Да'})
+            self.assertEqual(response.status_code, 302)
+        response = self.client.post(self.url, {'text': 'Да'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(self.post.comments.count(), 2)
+
+    @override_settings(THROTTLE_ENABLED=False)
+    def test_disabled_throttling_lets_burst_through(self):
+        for _ in range(3):
+            response = self.client.post(self.url, {'text': 'Да'})
+            self.assertEqual(response.status_code, 302)
+
+    def test_allowed_request_adds_no_queries(self):
+        request = RequestFactory().post('/')
+        request.user = self.user
+
+        @throttling.throttle('add_comment', '2/m')
+        def view(request):
+            return HttpResponse()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(view(request).status_code, 200)
+
+    def test_bucket_refills_over_time(self):
+        keys = ['throttle:test:ip:127.0.0.1']
+        self.assertEqual(throttling.take(keys, 1, 60, now=0), 0)
+        self.assertEqual(throttling.take(keys, 1, 60, now=30), 30)
+        self.assertEqual(throttling.take(keys, 1, 60, now=60), 0)
+
+
+class AsgiTests(TestCase):
+
+    def test_build_environ(self):
+        environ = build_environ({
+            'type': 'http',
+            'method': 'POST',
+            'path': '/посты/',
+            'query_string': b'page=2',
+            'headers': [
+                (b'content-type', b'text/plain'),
+                (b'accept', b'text/html'),
+                (b'accept', b'*/*'),
+            ],
+            'client': ('10.0.0.1', 5000),
+        }, BytesIO())
+        self.assertEqual(environ['PATH_INFO'], '/посты/'.encode().decode(
+            'latin-1'
+        ))
+        self.assertEqual(environ['QUERY_STRING'], 'page=2')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertEqual(environ['REMOTE_ADDR'], '10.0.0.1')
+
+    def test_repeated_cookie_headers_joined_as_cookie_list(self):
+        environ = build_environ({
+            'type': 'http',
+            'method': 'GET',
+            'path': '/',
+            'headers': [
+                (b'cookie', b'sessionid=abc'),
+                (b'cookie', b'csrftoken=xyz'),
+            ],
+        }, BytesIO())
+        request = WSGIRequest(environ)
+        self.assertEqual(
+            request.COOKIES, {'sessionid': 'abc', 'csrftoken': 'xyz'}
+        )
+
+    def test_serves_request(self):
+        """ASGI-обертка отдает ответ Django через пул потоков."""
+        application = ASGIHandler(get_wsgi_application(), workers=1)
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(application({
+            'type': 'http',
+            'method': 'GET',
+            'path': reverse('about:author'),
+            'headers': [(b'host', b'testserver')],
+        }, receive, send))
+        application.executor.shutdown()
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn(b'server-timing', dict(messages[0]['headers']))
+        self.assertTrue(messages[1]['body'])
+
+
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.root)
+
+    def test_same_content_stored_once_in_shards(self):
+        first = self.storage.save('posts/a.webp', ContentFile(b'meme'))
+        second = self.storage.save('posts/b.WEBP', ContentFile(b'meme'))
+        self.assertEqual(first, second)
+        digest, extension = first.rsplit('/', 1)[1].split('.')
+        self.assertEqual(first, f'posts/{digest[:2]}/{digest[2:4]}/'
+                                f'{digest}.{extension}')
+        self.assertEqual(extension, 'webp')
+        other = self.storage.save('posts/a.webp', ContentFile(b'other'))
+        self.assertNotEqual(other, first)
+
+    def test_media_served_immutable(self):
+        name = self.storage.save('posts/a.webp', ContentFile(b'meme'))
+        response = media_view(
+            RequestFactory().get('/'), name, document_root=self.root
+        )
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertIn('max-age=31536000', response['Cache-Control'])
@@ -0,0 +1,76 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def parse_rate(rate):
+    """'5/m' -> (5, 60): емкость ведра и период ее полного пополнения."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def bucket_keys(scope, request):
+    keys = [f"throttle:{scope}:ip:{request.META.get('REMOTE_ADDR', '')}"]
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        keys.append(f'throttle:{scope}:user:{user.pk}')
+    return keys
+
+
+def take(keys, capacity, period, now=None):
+    """
+    Берет по жетону из каждого ведра. Возвращает 0, если запрос разрешен,
+    иначе число секунд до появления жетона. Ведро хранится в кэше парой
+    (жетоны, время): пополнение считается при обращении, без фоновых задач.
+    Чтение и запись не атомарны, поэтому при гонке ведро может пропустить
+    лишний запрос — для защиты от всплесков это допустимо.
+    """
+    now = time.time() if now is None else now
+    refill = capacity / period
+    stored = cache.get_many(keys)
+    buckets = {}
+    for key in keys:
+        tokens, updated = stored.get(key, (capacity, now))
+        buckets[key] = min(capacity, tokens + (now - updated) * refill)
+    lowest = min(buckets.values())
+    if lowest < 1:
+        return math.ceil((1 - lowest) / refill)
+    cache.set_many(
+        {key: (tokens - 1, now) for key, tokens in buckets.items()},
+        period,
+    )
+    return 0
+
+
+def throttle(scope, rate, methods=('POST',)):
+    """
+    Ограничивает частоту запросов к представлению ведром жетонов на
+    пользователя и на IP. Лимит из декоратора можно переопределить в
+    THROTTLE_RATES[scope]. Ставится под login_required, чтобы
+    пользователь уже был загружен. При превышении отвечает 429.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in methods
+                    or not settings.THROTTLE_ENABLED):
+                return view(request, *args, **kwargs)
+            capacity, period = parse_rate(
+                settings.THROTTLE_RATES.get(scope, rate)
+            )
+            wait = take(bucket_keys(scope, request), capacity, period)
+            if not wait:
+                return view(request, *args, **kwargs)
+            response = render(
+                request, 'core/429.html', {'retry_after': wait}, status=429
+            )
+            response['Retry-After'] = str(wait)
+            return response
+        return wrapper
+    return decorator
@@ -1,4 +1,11 @@
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.views.static import serve
+
+from . import metrics
+from .storage import is_content_addressed
 
 
 def page_not_found(request, exception):
@@ -22,3 +29,25 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_view(request):
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponse(status=404)
+    return HttpResponse(
+        metrics.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def media_view(request, path, document_root=None, show_indexes=False):
+    """
+    Отдает медиа в разработке. Файлы с именем по хэшу содержимого
+    никогда не меняются, поэтому кэшируются браузером навсегда.
+    """
+    response = serve(request, path, document_root, show_indexes)
+    if response.status_code == 200 and is_content_addressed(path):
+        patch_cache_control(
+            response, public=True, max_age=365 * 24 * 60 * 60, immutable=True
+        )
+    return response
@@ -1,8 +1,20 @@
 from django.contrib import admin
 
+from . import search
 from .models import Group, Post, Comment, Follow
 
 
+class IndexedSearchMixin:
+    """Поиск в админке по полнотекстовому индексу вместо LIKE."""
+    search_kind = None
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search.build_match(search_term) or not search.is_supported():
+            return super().get_search_results(request, queryset, search_term)
+        ids = search.matching_ids(self.search_kind, search_term)
+        return queryset.filter(pk__in=ids), False
+
+
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('pk', 'title', 'description', 'created', 'slug',)
     list_display_links = ('pk', 'title', 'created',)
@@ -15,20 +27,22 @@ class CommentInLine(admin.TabularInline):
     model = Comment
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'created', 'author', 'group',)
     list_display_links = ('pk', 'text', 'created')
     list_editable = ('group',)
     search_fields = ('text',)
+    search_kind = search.POST
     list_filter = ('created',)
     empty_value_display = '-пусто-'
     inlines = [CommentInLine]
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(IndexedSearchMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'created', 'author', 'post')
     list_display_links = ('pk', 'text', 'created')
     search_fields = ('text',)
+    search_kind = search.COMMENT
     list_filter = ('created',)
 
 
@@ -0,0 +1,242 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Comment, Follow, Group, Post, User
+
+BENCH_PASSWORD = 'bench-password'
+
+
+@contextmanager
+def temporary_database():
+    """Отдельная файловая база SQLite на время замера."""
+    handle, name = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = name
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, serialize=False
+    )
+    try:
+        yield name
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def power_law_weights(size, alpha):
+    """Веса Ципфа: немногие авторы пишут большую часть постов."""
+    return [1 / (rank ** alpha) for rank in range(1, size + 1)]
+
+
+def seed(users=200, groups=20, posts=20000, comments=40000,
+         follows_per_user=20, alpha=1.2, batch_size=None, rng=None):
+    """Быстро наполняет базу синтетическими данными через bulk_create."""
+    rng = rng or random.Random(0)
+    password = make_password(BENCH_PASSWORD)
+    User.objects.bulk_create(
+        [User(username=f'bench_user{x}', password=password)
+         for x in range(users)],
+        batch_size=batch_size,
+    )
+    Group.objects.bulk_create(
+        [Group(title=f'Группа {x}', slug=f'bench-group-{x}',
+               description=f'Описание группы {x}')
+         for x in range(groups)],
+        batch_size=batch_size,
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith='bench_user'
+    ).values_list('pk', flat=True))
+    group_ids = list(Group.objects.filter(
+        slug__startswith='bench-group-'
+    ).values_list('pk', flat=True))
+    weights = power_law_weights(len(user_ids), alpha)
+    authors = rng.choices(user_ids, weights=weights, k=posts)
+    Post.objects.bulk_create(
+        [Post(text=f'Синтетический пост {x} ' * 5, author_id=author_id,
+              group_id=rng.choice(group_ids + [None]))
+         for x, author_id in enumerate(authors)],
+        batch_size=batch_size,
+    )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    commented = rng.choices(
+        post_ids, weights=power_law_weights(len(post_ids), alpha), k=comments
+    )
+    Comment.objects.bulk_create(
+        [Comment(post_id=post_id, author_id=rng.choice(user_ids),
+                 text=f'Комментарий {x}')
+         for x, post_id in enumerate(commented)],
+        batch_size=batch_size,
+    )
+    follow_pairs = set()
+    for user_id in user_ids:
+        for author_id in rng.choices(user_ids, weights=weights,
+                                     k=follows_per_user):
+            if author_id != user_id:
+                follow_pairs.add((user_id, author_id))
+    Follow.objects.bulk_create(
+        [Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in follow_pairs],
+        batch_size=batch_size,
+    )
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids),
+        'posts': len(post_ids),
+        'comments': comments,
+        'follows': len(follow_pairs),
+    }
+
+
+def percentile(values, fraction):
+    """Перцентиль методом ближайшего ранга."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Scenario:
+    """Случайные запросы к представлениям постов на засеянных данных."""
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random(1)
+        self.usernames = list(User.objects.filter(
+            username__startswith='bench_user'
+        ).values_list('username', flat=True))
+        self.slugs = list(Group.objects.values_list('slug', flat=True))
+        self.post_ids = list(Post.objects.values_list('pk', flat=True))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def client(self, authenticated=False):
+        """Клиенты живут в потоке: у каждого потока свой пользователь."""
+        local = self._local
+        if not hasattr(local, 'guest'):
+            local.guest = Client()
+            local.user = Client()
+            local.user.login(
+                username=self.choice(self.usernames),
+                password=BENCH_PASSWORD,
+            )
+        return local.user if authenticated else local.guest
+
+    def choice(self, sequence):
+        with self._lock:
+            return self.rng.choice(sequence)
+
+    def requests(self):
+        """Имя представления -> функция, делающая один запрос."""
+        return {
+            'index': lambda: self.client().get(
+                reverse('posts:index'),
+                {'page': self.choice(range(1, 6))},
+            ),
+            'group_posts': lambda: self.client().get(reverse(
+                'posts:group_list', kwargs={'slug': self.choice(self.slugs)}
+            )),
+            'profile': lambda: self.client().get(reverse(
+                'posts:profile',
+                kwargs={'username': self.choice(self.usernames)},
+            )),
+            'post_detail': lambda: self.client().get(reverse(
+                'posts:post_detail',
+                kwargs={'post_id': self.choice(self.post_ids)},
+            )),
+            'follow_index': lambda: self.client(True).get(
+                reverse('posts:follow_index')
+            ),
+            'post_create': lambda: self.client(True).post(
+                reverse('posts:post_create'), {'text': 'Нагрузка'}
+            ),
+            'add_comment': lambda: self.client(True).post(
+                reverse('posts:add_comment',
+                        kwargs={'post_id': self.choice(self.post_ids)}),
+                {'text': 'Нагрузочный комментарий'},
+            ),
+        }
+
+
+def measure(make_request):
+    with CaptureQueriesContext(connection) as queries:
+        started = time.perf_counter()
+        response = make_request()
+        elapsed = time.perf_counter() - started
+    return elapsed, len(queries), response.status_code
+
+
+def run_view(make_request, requests, concurrency):
+    """
+    Гоняет одно представление в нескольких потоках и возвращает сводку.
+    Первый запрос каждого потока прогревочный и в статистику не входит.
+    """
+    results = []
+    lock = threading.Lock()
+    per_thread = [
+        requests // concurrency + (1 if x < requests % concurrency else 0)
+        for x in range(concurrency)
+    ]
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(count):
+        try:
+            try:
+                make_request()
+            except Exception:
+                barrier.abort()
+                raise
+            barrier.wait()
+            measured = [measure(make_request) for _ in range(count)]
+            with lock:
+                results.extend(measured)
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=worker, args=(count,))
+        for count in per_thread
+    ]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    return summarize(results, wall, concurrency)
+
+
+def summarize(results, wall, concurrency):
+    """Сводка замеров. Без замеров задержки и запросы не определены."""
+    latencies = [elapsed * 1000 for elapsed, _, _ in results]
+    queries = [count for _, count, _ in results]
+    errors = sum(1 for _, _, status in results if not 200 <= status < 400)
+    summary = {
+        'requests': len(results),
+        'concurrency': concurrency,
+        'errors': errors,
+    }
+    if not results:
+        return dict(summary, **dict.fromkeys([
+            'p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps',
+            'queries_avg', 'queries_max',
+        ]))
+    return {
+        **summary,
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'throughput_rps': round(len(results) / wall, 1),
+        'queries_avg': round(sum(queries) / len(queries), 2),
+        'queries_max': max(queries),
+    }
@@ -0,0 +1,286 @@
+import hashlib
+import time
+from functools import wraps
+
+from core.routers import reading_replicas
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from .models import Group, Post, User
+
+FEED = 'feed'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def author_block_scope(author_id):
+    """Блок автора на страницах его постов: имя и счетчики."""
+    return f'author_block:{author_id}'
+
+
+def post_author_key(post_id):
+    return f'post_author:{post_id}'
+
+
+def timeline_scope(user_id):
+    return f'timeline:{user_id}'
+
+
+def scope_key(prefix, scope):
+    """
+    Ключ кэша для области. В слагах групп и именах бывают не-ASCII
+    символы, которые memcached не примет, поэтому область хэшируется.
+    """
+    return '{}:{}'.format(prefix, hashlib.md5(scope.encode()).hexdigest())
+
+
+def generation_key(scope):
+    return scope_key('generation', scope)
+
+
+def new_generation():
+    """
+    Новое поколение берется из часов, а не с единицы: если ключ поколения
+    вытеснен из кэша, старые страницы с прежним номером не оживут.
+    """
+    return time.time_ns()
+
+
+def get_generations(scopes):
+    keys = [generation_key(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    missing = {
+        key: new_generation() for key in keys if key not in generations
+    }
+    if missing:
+        cache.set_many(missing, None)
+        generations.update(missing)
+    return [generations[key] for key in keys]
+
+
+def bumped_key(scope):
+    return scope_key('bumped', scope)
+
+
+def bump(*scopes):
+    """Сдвигает поколения: закэшированные страницы областей устаревают."""
+    for scope in scopes:
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_generation(), None)
+    cache.set_many(
+        {bumped_key(scope): time.time() for scope in scopes},
+        settings.REPLICA_STICKY_SECONDS,
+    )
+
+
+def recently_bumped(scopes):
+    """Область менялась недавно: реплика могла еще не догнать запись."""
+    return bool(cache.get_many([bumped_key(scope) for scope in scopes]))
+
+
+def viewer_key(request):
+    """
+    Часть ключа страницы от посетителя. cache_page стоит под
+    SessionMiddleware и не видит Vary: Cookie, поэтому без нее страница
+    первого посетителя с его именем и CSRF-токеном ушла бы всем.
+    """
+    csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    source = f'{request.user.pk}|{csrf_cookie}'
+    return hashlib.md5(source.encode()).hexdigest()
+
+
+def keep_private_csrf(view):
+    """
+    Страница с CSRF-токеном, выданным без cookie, в кэш не попадает:
+    cookie ставит CsrfViewMiddleware только при рендере, а ответ из кэша
+    пришел бы с токеном, но без cookie.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if (request.META.get('CSRF_COOKIE_USED')
+                and settings.CSRF_COOKIE_NAME not in request.COOKIES):
+            patch_cache_control(response, private=True)
+        return response
+    return wrapper
+
+
+def cache_versioned(get_scopes):
+    """
+    Кэширует страницу как cache_page, но добавляет к префиксу ключа
+    поколения областей. Запись в область сразу делает кэш неактуальным.
+    Страницы кэшируются отдельно для каждого посетителя, см. viewer_key.
+
+    Реплика может отставать от основной базы. Страница, прочитанная
+    с реплики в течение REPLICA_STICKY_SECONDS после записи в область,
+    могла не увидеть эту запись, поэтому в кэш не кладется: иначе старые
+    данные жили бы под новым поколением весь PAGE_CACHE_TIMEOUT.
+    """
+    def decorator(view):
+        private_view = keep_private_csrf(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            scopes = get_scopes(*args, **kwargs)
+            if reading_replicas() and recently_bumped(scopes):
+                return view(request, *args, **kwargs)
+            generations = get_generations(scopes)
+            key_prefix = '{}:{}:{}'.format(
+                view.__name__,
+                viewer_key(request),
+                '.'.join(map(str, generations)),
+            )
+            cached_view = cache_page(
+                settings.PAGE_CACHE_TIMEOUT, key_prefix=key_prefix
+            )(private_view)
+            return cached_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def newest(queryset):
+    return queryset.order_by('-created').values_list(
+        'created', flat=True
+    ).first()
+
+
+def conditional(get_scopes, get_newest, revalidate=False):
+    """
+    Отвечает 304 по If-None-Match до выборки страницы. ETag собирается из
+    самой свежей даты created в выдаче, поколений кэша и пользователя,
+    поэтому меняется и при правке постов, и при новых комментариях.
+    Last-Modified не отдается: дата публикации при правках и комментариях
+    не меняется, и ответ на If-Modified-Since был бы устаревшим.
+
+    С revalidate браузер не держит страницу по max-age из cache_page,
+    а каждый раз сверяет ETag: страница зависит от пользователя.
+    """
+    def etag(request, *args, **kwargs):
+        generations = get_generations(get_scopes(request, *args, **kwargs))
+        source = '|'.join([
+            request.get_full_path(),
+            str(request.user.pk),
+            str(get_newest(request, *args, **kwargs)),
+            *map(str, generations),
+        ])
+        return hashlib.md5(source.encode()).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag)(view)
+        if not revalidate:
+            return conditional_view
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(
+                response, private=True, no_cache=True, max_age=0
+            )
+            if response.has_header('Expires'):
+                del response['Expires']
+            return response
+        return wrapper
+    return decorator
+
+
+def index_scopes():
+    return [FEED]
+
+
+def group_scopes(slug):
+    return [group_scope(slug)]
+
+
+def profile_scopes(username):
+    return [author_scope(username)]
+
+
+def post_author_id(post_id):
+    """Автор поста по id из кэша: попадание в кэш страниц не ходит в базу."""
+    key = post_author_key(post_id)
+    author_id = cache.get(key)
+    if author_id is None:
+        author_id = Post.objects.filter(pk=post_id).values_list(
+            'author_id', flat=True
+        ).first()
+        if author_id is not None:
+            cache.set(key, author_id, settings.PAGE_CACHE_TIMEOUT)
+    return author_id
+
+
+def forget_post_author(post_id):
+    key = post_author_key(post_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def post_detail_scopes(post_id):
+    return [post_scope(post_id), author_block_scope(post_author_id(post_id))]
+
+
+def comments_scopes(post_id):
+    return [post_scope(post_id)]
+
+
+def invalidate_post(post_id, group_ids=(), author_ids=()):
+    """Сбрасывает все страницы, на которых показан пост."""
+    slugs = Group.objects.filter(
+        pk__in=[pk for pk in group_ids if pk]
+    ).values_list('slug', flat=True)
+    bump(
+        FEED,
+        post_scope(post_id),
+        *map(group_scope, slugs),
+        *author_scopes(author_ids),
+    )
+
+
+def invalidate_post_of_comment(post_id):
+    row = Post.objects.filter(pk=post_id).values_list(
+        'group_id', 'author_id'
+    ).first()
+    group_id, author_id = row or (None, None)
+    invalidate_post(post_id, [group_id], [author_id])
+
+
+def invalidate_group(slug):
+    bump(FEED, group_scope(slug))
+
+
+def author_scopes(author_ids):
+    """Профили авторов и блоки автора на страницах их постов."""
+    author_ids = [pk for pk in author_ids if pk]
+    usernames = User.objects.filter(pk__in=author_ids).values_list(
+        'username', flat=True
+    )
+    return [
+        *map(author_scope, usernames), *map(author_block_scope, author_ids)
+    ]
+
+
+def invalidate_author_posts(author_id):
+    """Сбрасывает все страницы с постами автора: после смены его имени."""
+    slugs = Group.objects.filter(
+        posts__author_id=author_id
+    ).distinct().values_list('slug', flat=True)
+    bump(FEED, *map(group_scope, slugs), *author_scopes([author_id]))
+
+
+def invalidate_author(author_id):
+    bump(*author_scopes([author_id]))
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'includes/posts/post_card.html'
+
+
+def card_key(post, show_author):
+    return f'post_card:{post.pk}:{post.version}:{int(show_author)}'
+
+
+def render_cards(posts, show_author=True):
+    """
+    Возвращает пары (пост, html карточки). Готовые карточки читаются
+    одним get_many. Ключ содержит версию поста из той же строки, по
+    которой рисуется карточка, поэтому правка между выборкой и записью
+    в кэш не сохранит старый html под новым ключом.
+    """
+    posts = list(posts)
+    keys = [card_key(post, show_author) for post in posts]
+    found = cache.get_many(keys)
+    template = None
+    new_cards = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        html = found.get(key)
+        if html is None:
+            template = template or get_template(CARD_TEMPLATE)
+            html = str(template.render({
+                'post': post, 'show_author': show_author
+            }))
+            new_cards[key] = html
+        cards.append((post, mark_safe(html)))
+    if new_cards:
+        cache.set_many(new_cards, settings.PAGE_CACHE_TIMEOUT)
+    return cards
@@ -0,0 +1,41 @@
+from django.db.models import F, FilteredRelation, Q
+
+from .models import Comment, Post
+
+
+def index_posts():
+    return Post.objects.select_related('group', 'author')
+
+
+def hot_posts():
+    """Популярное: по оценке trending, порядок берется из post_hot_idx."""
+    return Post.objects.select_related('group', 'author').order_by(
+        '-hot', '-pk'
+    )
+
+
+def group_posts(group):
+    return group.posts.select_related('author')
+
+
+def author_posts(author):
+    return author.posts.select_related('group')
+
+
+# Лента подписок сортируется по записям TimelineEntry, чтобы запрос шел
+# по индексу (user, created, post) без сортировки во временном дереве.
+FOLLOW_KEY = ('feed__created', 'feed__post')
+
+
+def follow_posts(user):
+    return Post.objects.annotate(
+        feed=FilteredRelation(
+            'timeline_entries', condition=Q(timeline_entries__user=user)
+        ),
+    ).filter(feed__isnull=False).select_related('author', 'group').order_by(
+        *(F(field).desc() for field in FOLLOW_KEY)
+    )
+
+
+def post_comments(post_id):
+    return Comment.objects.filter(post_id=post_id).select_related('author')
@@ -1,5 +1,7 @@
+from django.core.files.uploadedfile import UploadedFile
 from django.forms import ModelForm
 
+from . import images, thumbnails
 from .models import Comment, Post
 
 
@@ -9,6 +11,22 @@ class PostForm(ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            return images.ingest(image)
+        return image
+
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            # Копии для srcset режет пул после коммита, а до тех пор
+            # шаблон показывает саму картинку.
+            self.instance.image_widths = ''
+        post = super().save(commit)
+        if commit and 'image' in self.changed_data and post.image:
+            thumbnails.schedule_variants(post.image.name)
+        return post
+
 
 class CommentForm(ModelForm):
 
@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import scope_key
+from .models import Follow, User
+
+
+def following_key(user_id):
+    return f'graph:following:{user_id}'
+
+
+def followers_key(author_id):
+    return f'graph:followers:{author_id}'
+
+
+def username_key(username):
+    # Имена пользователей бывают не ASCII: в ключе только их хэш.
+    return scope_key('graph:username', username)
+
+
+def following_ids(user_id):
+    """Множество id авторов, на которых подписан пользователь."""
+    if user_id is None:
+        return frozenset()
+    key = following_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(Follow.objects.filter(
+            user_id=user_id, author__isnull=False
+        ).order_by().values_list('author_id', flat=True))
+        cache.set(key, ids, settings.FOLLOW_GRAPH_TIMEOUT)
+    return ids
+
+
+def is_following(user, author):
+    if not user.is_authenticated:
+        return False
+    return author.pk in following_ids(user.pk)
+
+
+def follower_count(author_id):
+    key = followers_key(author_id)
+    count = cache.get(key)
+    if count is None:
+        count = Follow.objects.filter(author_id=author_id).count()
+        cache.set(key, count, settings.FOLLOW_GRAPH_TIMEOUT)
+    return count
+
+
+def user_id(username):
+    """id пользователя по имени или None, если такого нет."""
+    key = username_key(username)
+    pk = cache.get(key)
+    if pk is None:
+        pk = User.objects.filter(username=username).values_list(
+            'pk', flat=True
+        ).first()
+        if pk is not None:
+            cache.set(key, pk, settings.FOLLOW_GRAPH_TIMEOUT)
+    return pk
+
+
+def forget_user(username):
+    cache.delete(username_key(username))
+
+
+def change(user_id, author_id):
+    """
+    Сбрасывает подписки пользователя и счетчик подписчиков автора после
+    коммита: откаченная запись не оставит в кэше лишнего, а параллельные
+    подписки не затрут друг друга. Следующее чтение возьмет их из базы.
+    """
+    keys = []
+    if user_id is not None:
+        keys.append(following_key(user_id))
+    if author_id is not None:
+        keys.append(followers_key(author_id))
+    transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,153 @@
+import os
+import time
+from io import BytesIO
+
+from core.storage import is_content_addressed
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import Post
+
+
+def read_limited(upload, limit):
+    """Читает загрузку частями и прекращает чтение за пределом размера."""
+    if upload.size is not None and upload.size > limit:
+        raise ValidationError(
+            f'Файл больше {limit // (1024 * 1024)} МБ', code='too_large'
+        )
+    buffer = BytesIO()
+    upload.seek(0)
+    for chunk in upload.chunks():
+        if buffer.tell() + len(chunk) > limit:
+            raise ValidationError(
+                f'Файл больше {limit // (1024 * 1024)} МБ', code='too_large'
+            )
+        buffer.write(chunk)
+    buffer.seek(0)
+    return buffer
+
+
+def web_mode(image):
+    """RGB, а при прозрачности RGBA: палитры и CMYK в вебе не нужны."""
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        return image.convert('RGBA')
+    return image.convert('RGB')
+
+
+def encode(image):
+    """Кодирует без EXIF и ICC: метаданные в файл не переносятся."""
+    output = BytesIO()
+    image.save(
+        output, format=settings.IMAGE_FORMAT, quality=settings.IMAGE_QUALITY
+    )
+    return output.getvalue()
+
+
+def resize_to_width(image, width):
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def ingest(upload):
+    """
+    Проверяет размер и габариты загрузки, поворачивает по EXIF,
+    уменьшает до IMAGE_MASTER_WIDTH и перекодирует в IMAGE_FORMAT.
+    Возвращает ContentFile, который можно отдать в Post.image.
+    """
+    data = read_limited(upload, settings.IMAGE_MAX_BYTES)
+    try:
+        image = Image.open(data)
+        # Габариты читаются из заголовка, пиксели еще не распакованы.
+        width, height = image.size
+        if max(width, height) > settings.IMAGE_MAX_SIDE:
+            raise ValidationError(
+                f'Картинка больше {settings.IMAGE_MAX_SIDE} px по стороне',
+                code='too_big',
+            )
+        image = web_mode(ImageOps.exif_transpose(image))
+    except (OSError, Image.DecompressionBombError):
+        raise ValidationError(
+            'Не удалось прочитать картинку', code='invalid_image'
+        )
+    if image.width > settings.IMAGE_MASTER_WIDTH:
+        image = resize_to_width(image, settings.IMAGE_MASTER_WIDTH)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    extension = settings.IMAGE_FORMAT.lower()
+    return ContentFile(encode(image), name=f'{stem}.{extension}')
+
+
+def is_master(name):
+    """Картинка прошла ingest: уже уменьшена и перекодирована."""
+    extension = os.path.splitext(name)[1].lower()
+    return is_content_addressed(name) and (
+        extension == f'.{settings.IMAGE_FORMAT.lower()}'
+    )
+
+
+def variant_name(name, width):
+    root, extension = os.path.splitext(name)
+    return f'{root}_w{width}{extension}'
+
+
+def save_variants(field_file):
+    """
+    Сохраняет уменьшенные копии шириной из IMAGE_WIDTHS рядом с картинкой.
+    Возвращает ширины созданных копий строкой для Post.image_widths.
+    """
+    storage = field_file.storage
+    with storage.open(field_file.name) as source:
+        image = Image.open(source)
+        image.load()
+    widths = [
+        width for width in settings.IMAGE_WIDTHS if width < image.width
+    ]
+    for width in widths:
+        # Имя копии выводится из имени исходника, а исходник не
+        # перезаписывается, поэтому готовую копию можно не пересоздавать.
+        name = variant_name(field_file.name, width)
+        if not storage.exists(name):
+            storage.save(
+                name, ContentFile(encode(resize_to_width(image, width)))
+            )
+    return ','.join(map(str, widths))
+
+
+def recently_saved(storage, name, moment):
+    try:
+        modified = os.path.getmtime(storage.path(name))
+    except OSError:
+        return False
+    return modified > moment - settings.IMAGE_RELEASE_GRACE
+
+
+def release(name, scheduled=None):
+    """
+    Удаляет картинку и ее копии, если на них не ссылается ни один пост.
+    Одинаковые загрузки хранятся одним файлом, поэтому счетчиком ссылок
+    служат сами строки Post. Пост с той же картинкой может быть еще не
+    закоммичен, поэтому файл, загруженный заново позже чем за
+    IMAGE_RELEASE_GRACE секунд до освобождения, остается на месте.
+    """
+    if not name or Post.objects.filter(image=name).exists():
+        return
+    storage = Post._meta.get_field('image').storage
+    if is_content_addressed(name) and recently_saved(
+        storage, name, time.time() if scheduled is None else scheduled
+    ):
+        return
+    for width in settings.IMAGE_WIDTHS:
+        storage.delete(variant_name(name, width))
+    storage.delete(name)
+
+
+def srcset(field_file, widths, width):
+    """Строка srcset из копий и самой картинки."""
+    storage = field_file.storage
+    candidates = [
+        f'{storage.url(variant_name(field_file.name, int(size)))} {size}w'
+        for size in widths.split(',') if size
+    ]
+    candidates.append(f'{field_file.url} {width}w')
+    return ', '.join(candidates)
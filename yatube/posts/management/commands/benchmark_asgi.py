@@ -0,0 +1,129 @@
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from core.asgi import ASGIHandler, build_environ
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.urls import reverse
+from posts import benchmark
+from posts.models import Group, Post, User
+
+
+def read_paths(count, rng):
+    """Случайные адреса лент и постов для анонимного читателя."""
+    usernames = list(User.objects.values_list('username', flat=True))
+    slugs = list(Group.objects.values_list('slug', flat=True))
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    makers = [
+        lambda: reverse('posts:index'),
+        lambda: reverse('posts:group_list',
+                        kwargs={'slug': rng.choice(slugs)}),
+        lambda: reverse('posts:profile',
+                        kwargs={'username': rng.choice(usernames)}),
+        lambda: reverse('posts:post_detail',
+                        kwargs={'post_id': rng.choice(post_ids)}),
+    ]
+    return [rng.choice(makers)() for _ in range(count)]
+
+
+def http_scope(path):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'query_string': b'',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 0),
+    }
+
+
+def summarize(latencies, wall):
+    latencies = [latency * 1000 for latency in latencies]
+    return {
+        'clients': len(latencies),
+        'wall_s': round(wall, 3),
+        'p50_ms': round(benchmark.percentile(latencies, 0.50), 1),
+        'p95_ms': round(benchmark.percentile(latencies, 0.95), 1),
+        'throughput_rps': round(len(latencies) / wall, 1),
+    }
+
+
+def run_wsgi(handler, paths, workers, client_delay):
+    """
+    Синхронный сервер: поток пишет ответ в сокет сам и остается занят,
+    пока медленный клиент его не дочитает.
+    """
+    def serve(path):
+        try:
+            handler.run_wsgi(build_environ(http_scope(path), BytesIO()))
+            time.sleep(client_delay)
+            return time.perf_counter() - started
+        finally:
+            connections.close_all()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        latencies = list(executor.map(serve, paths))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+def run_asgi(handler, paths, client_delay):
+    """ASGI: медленный клиент дочитывает ответ в цикле событий."""
+    async def serve(path):
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.body':
+                await asyncio.sleep(client_delay)
+
+        await handler(http_scope(path), receive, send)
+        return time.perf_counter() - started
+
+    async def main():
+        return await asyncio.gather(*(serve(path) for path in paths))
+
+    started = time.perf_counter()
+    latencies = asyncio.run(main())
+    return summarize(latencies, time.perf_counter() - started)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает WSGI и ASGI-точку входа на одинаковом числе потоков '
+        'при большом числе медленных клиентов. Сеть моделируется: клиент '
+        'дочитывает каждый ответ client-delay секунд.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=200)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--client-delay', type=float, default=0.2)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        asgi = ASGIHandler(
+            get_wsgi_application(), workers=options['workers']
+        )
+        with benchmark.temporary_database():
+            benchmark.seed(
+                users=100, posts=options['posts'], comments=options['posts']
+            )
+            paths = read_paths(
+                options['clients'], random.Random(options['seed'])
+            )
+            cache.clear()
+            report = {'wsgi': run_wsgi(
+                asgi, paths, options['workers'], options['client_delay']
+            )}
+            cache.clear()
+            report['asgi'] = run_asgi(asgi, paths, options['client_delay'])
+            asgi.executor.shutdown()
+        self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
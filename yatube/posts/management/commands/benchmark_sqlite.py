@@ -0,0 +1,118 @@
+import json
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.test.utils import override_settings
+from posts import benchmark, feeds
+from posts.models import Comment, Post, User
+
+PROFILES = {
+    # Настройки SQLite по умолчанию: журнал отката и отложенные транзакции.
+    'default': {
+        'SQLITE_PRAGMAS': {},
+        'SQLITE_IMMEDIATE_TRANSACTIONS': False,
+    },
+    'tuned': {
+        'SQLITE_PRAGMAS': settings.SQLITE_PRAGMAS,
+        'SQLITE_IMMEDIATE_TRANSACTIONS': True,
+    },
+}
+
+
+def run_mixed(readers, writers, duration):
+    """
+    Читатели листают главную ленту, писатели добавляют комментарии.
+    Возвращает число операций и ошибок блокировки за отведенное время.
+    """
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(readers + writers + 1)
+    deadline = []
+
+    def read(rng):
+        list(feeds.index_posts()[:settings.PAGINATOR_CONST])
+
+    def write(rng):
+        with transaction.atomic():
+            Comment.objects.create(
+                post_id=rng.choice(post_ids),
+                author_id=rng.choice(user_ids),
+                text='Нагрузочный комментарий',
+            )
+
+    def worker(kind, operation, seed):
+        rng = random.Random(seed)
+        done = locked = 0
+        try:
+            barrier.wait()
+            while time.perf_counter() < deadline[0]:
+                try:
+                    operation(rng)
+                except OperationalError:
+                    locked += 1
+                else:
+                    done += 1
+        finally:
+            connections.close_all()
+            with lock:
+                counts[kind] += done
+                counts['locked'] += locked
+
+    threads = [
+        threading.Thread(target=worker, args=('reads', read, x))
+        for x in range(readers)
+    ] + [
+        threading.Thread(target=worker, args=('writes', write, x))
+        for x in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline.append(time.perf_counter() + duration)
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    return {
+        'reads_per_s': round(counts['reads'] / duration, 1),
+        'writes_per_s': round(counts['writes'] / duration, 1),
+        'locked_errors': counts['locked'],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при параллельных чтениях '
+        'и записях с настройками по умолчанию и с WAL-профилем.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument(
+            '--profiles', nargs='+', choices=PROFILES, default=list(PROFILES)
+        )
+
+    def handle(self, *args, **options):
+        report = {}
+        for name in options['profiles']:
+            # Каждый профиль на свежем файле: WAL сохраняется в самой базе.
+            with override_settings(**PROFILES[name]):
+                connections.close_all()
+                with benchmark.temporary_database():
+                    benchmark.seed(
+                        posts=options['posts'], comments=options['posts']
+                    )
+                    report[name] = run_mixed(
+                        options['readers'],
+                        options['writers'],
+                        options['duration'],
+                    )
+            self.stderr.write(f'{name}: {report[name]}')
+        self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
@@ -0,0 +1,132 @@
+import json
+import random
+import subprocess
+from contextlib import ExitStack
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from posts import benchmark
+
+DERIVED_COMMANDS = (
+    'rebuild_comments_count',
+    'rebuild_author_stats',
+    'reconcile_counters',
+    'rebuild_timelines',
+    'rebuild_search_index',
+)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Засевает временную базу синтетическими данными и меряет '
+        'задержки, пропускную способность и число запросов к БД '
+        'у представлений постов. Результат пишется в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=40000)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--alpha', type=float, default=1.2,
+                            help='Показатель степенного распределения')
+        parser.add_argument('--requests', type=int, default=200,
+                            help='Запросов на каждое представление')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--views', nargs='*',
+                            help='Только перечисленные представления')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--no-cache', action='store_true',
+                            help='Мерить без кэша страниц')
+        parser.add_argument('--output', default='benchmark.json')
+
+    def handle(self, *args, **options):
+        # Первый запрос каждого потока прогревочный: при запросах меньше,
+        # чем потоков, часть потоков ничего бы не мерила.
+        if not 1 <= options['concurrency'] <= options['requests']:
+            raise CommandError(
+                'Нужно 1 <= --concurrency <= --requests, получено '
+                f'{options["concurrency"]} и {options["requests"]}'
+            )
+        with benchmark.temporary_database(), ExitStack() as stack:
+            # Все запросы идут от одного IP и немногих пользователей:
+            # с ограничением частоты мерилась бы отдача 429.
+            stack.enter_context(override_settings(THROTTLE_ENABLED=False))
+            if options['no_cache']:
+                stack.enter_context(override_settings(CACHES={
+                    'default': {
+                        'BACKEND': (
+                            'django.core.cache.backends.dummy.DummyCache'
+                        ),
+                    },
+                }))
+            report = self.run(options)
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+            output.write('\n')
+        self.stdout.write(f'Результат записан в {options["output"]}')
+        failed = [
+            name for name, summary in report['views'].items()
+            if summary['errors']
+        ]
+        if failed:
+            raise CommandError(
+                f'Ответы с ошибками у представлений: {", ".join(failed)}'
+            )
+
+    def run(self, options):
+        rng = random.Random(options['seed'])
+        dataset = benchmark.seed(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows_per_user=options['follows_per_user'],
+            alpha=options['alpha'],
+            rng=rng,
+        )
+        for command in DERIVED_COMMANDS:
+            call_command(command, stdout=StringIO())
+        self.stdout.write(f'Данные: {dataset}')
+        scenario = benchmark.Scenario(random.Random(options['seed'] + 1))
+        views = {}
+        for name, make_request in scenario.requests().items():
+            if options['views'] and name not in options['views']:
+                continue
+            cache.clear()
+            views[name] = benchmark.run_view(
+                make_request, options['requests'], options['concurrency']
+            )
+            self.stdout.write(
+                '{:<14} p50={p50_ms}ms p95={p95_ms}ms p99={p99_ms}ms '
+                'rps={throughput_rps} queries={queries_avg} '
+                'errors={errors}'.format(name, **views[name])
+            )
+        return {
+            'revision': git_revision(),
+            'dataset': dataset,
+            'options': {
+                key: options[key]
+                for key in (
+                    'alpha', 'requests', 'concurrency', 'seed', 'no_cache'
+                )
+            },
+            'views': views,
+        }
@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand
+from posts.models import Comment, Follow, Group, Post
+
+# Порядок важен: при импорте внешние ключи ссылаются на уже загруженное.
+EXPORTS = (
+    ('group', Group, {
+        'pk': 'pk',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+        'created': 'created',
+    }),
+    ('post', Post, {
+        'pk': 'pk',
+        'text': 'text',
+        'created': 'created',
+        'author': 'author__username',
+        'group': 'group_id',
+        'image': 'image',
+    }),
+    ('comment', Comment, {
+        'pk': 'pk',
+        'text': 'text',
+        'created': 'created',
+        'post': 'post_id',
+        'author': 'author__username',
+    }),
+    ('follow', Follow, {
+        'pk': 'pk',
+        'created': 'created',
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает группы, посты, комментарии и подписки в JSONL. '
+        'Пользователи записываются по username.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл для выгрузки')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        with open(options['path'], 'w', encoding='utf-8') as output:
+            for name, model, fields in EXPORTS:
+                rows = model.objects.order_by('pk').values_list(
+                    *fields.values()
+                ).iterator(chunk_size=chunk_size)
+                written = 0
+                for row in rows:
+                    record = {'model': name}
+                    record.update(zip(fields, row))
+                    record['created'] = record['created'].isoformat()
+                    output.write(json.dumps(record, ensure_ascii=False))
+                    output.write('\n')
+                    written += 1
+                    if written % chunk_size == 0:
+                        self.stdout.write(f'{name}: {written}')
+                self.stdout.write(f'{name}: выгружено {written}')
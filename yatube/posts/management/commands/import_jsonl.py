@@ -0,0 +1,208 @@
+import json
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+from posts.models import Comment, Follow, Group, Post, User
+
+MODELS = {
+    'group': Group,
+    'post': Post,
+    'comment': Comment,
+    'follow': Follow,
+}
+
+REBUILD_COMMANDS = (
+    'rebuild_comments_count',
+    'rebuild_hot_scores',
+    'rebuild_author_stats',
+    'reconcile_counters',
+    'rebuild_timelines',
+    'rebuild_search_index',
+)
+
+
+@contextmanager
+def keep_created(*models):
+    """Не дает auto_now_add перезаписать даты из выгрузки."""
+    fields = [model._meta.get_field('created') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """
+    Загружает записи пачками через bulk_create. Новые первичные ключи
+    выдаются заранее, поэтому ссылки из выгрузки переводятся на них
+    без повторных запросов.
+    """
+
+    def __init__(self, batch_size, report):
+        self.batch_size = batch_size
+        self.report = report
+        self.pk_maps = {name: {} for name in MODELS}
+        self.next_pk = {
+            name: (model.objects.aggregate(Max('pk'))['pk__max'] or 0) + 1
+            for name, model in MODELS.items()
+        }
+        self.users = {}
+        self.buffer = []
+        self.buffer_model = None
+        self.loaded = dict.fromkeys(MODELS, 0)
+        self.skipped = 0
+
+    def add(self, record):
+        name = record.pop('model', None)
+        if name not in MODELS:
+            raise CommandError(f'Неизвестная модель: {name}')
+        if name != self.buffer_model or len(self.buffer) >= self.batch_size:
+            self.flush()
+        self.buffer_model = name
+        self.buffer.append(record)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        name, records = self.buffer_model, self.buffer
+        self.buffer = []
+        self.resolve_users(records)
+        with transaction.atomic():
+            getattr(self, f'load_{name}')(records)
+        self.report(f'{name}: загружено {self.loaded[name]}')
+
+    def resolve_users(self, records):
+        usernames = {
+            record[key] for record in records
+            for key in ('author', 'user') if record.get(key)
+        } - self.users.keys()
+        if not usernames:
+            return
+        existing = dict(User.objects.filter(
+            username__in=usernames
+        ).values_list('username', 'pk'))
+        missing = usernames - existing.keys()
+        if missing:
+            new_users = [User(username=username) for username in missing]
+            for user in new_users:
+                user.set_unusable_password()
+            User.objects.bulk_create(new_users)
+            existing.update(User.objects.filter(
+                username__in=missing
+            ).values_list('username', 'pk'))
+        self.users.update(existing)
+
+    def allocate_pk(self, name, old_pk):
+        pk = self.next_pk[name]
+        self.next_pk[name] += 1
+        self.pk_maps[name][old_pk] = pk
+        return pk
+
+    def save(self, name, objects, **kwargs):
+        MODELS[name].objects.bulk_create(objects, **kwargs)
+        self.loaded[name] += len(objects)
+
+    def load_group(self, records):
+        existing = dict(Group.objects.filter(
+            slug__in=[record['slug'] for record in records]
+        ).values_list('slug', 'pk'))
+        groups = []
+        for record in records:
+            if record['slug'] in existing:
+                self.pk_maps['group'][record['pk']] = existing[record['slug']]
+                continue
+            groups.append(Group(
+                pk=self.allocate_pk('group', record['pk']),
+                title=record['title'],
+                slug=record['slug'],
+                description=record['description'],
+                created=parse_datetime(record['created']),
+            ))
+        self.save('group', groups)
+
+    def load_post(self, records):
+        self.save('post', [
+            Post(
+                pk=self.allocate_pk('post', record['pk']),
+                text=record['text'],
+                created=parse_datetime(record['created']),
+                author_id=self.users.get(record['author']),
+                group_id=self.pk_maps['group'].get(record['group']),
+                image=record['image'] or '',
+            )
+            for record in records
+        ])
+
+    def load_comment(self, records):
+        comments = []
+        for record in records:
+            post_id = self.pk_maps['post'].get(record['post'])
+            if post_id is None:
+                self.skipped += 1
+                continue
+            comments.append(Comment(
+                pk=self.allocate_pk('comment', record['pk']),
+                text=record['text'],
+                created=parse_datetime(record['created']),
+                post_id=post_id,
+                author_id=self.users[record['author']],
+            ))
+        self.save('comment', comments)
+
+    def load_follow(self, records):
+        self.save('follow', [
+            Follow(
+                created=parse_datetime(record['created']),
+                user_id=self.users.get(record['user']),
+                author_id=self.users.get(record['author']),
+            )
+            for record in records
+        ], ignore_conflicts=True)
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает JSONL из export_jsonl пачками bulk_create '
+        'и затем пересчитывает производные таблицы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл выгрузки')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help='Не пересчитывать счетчики, ленты и поисковый индекс',
+        )
+
+    def handle(self, *args, **options):
+        importer = Importer(options['batch_size'], self.stdout.write)
+        with keep_created(*MODELS.values()):
+            with open(options['path'], encoding='utf-8') as source:
+                for line_number, line in enumerate(source, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError as error:
+                        raise CommandError(
+                            f'Строка {line_number}: {error}'
+                        )
+                    importer.add(record)
+            importer.flush()
+        if importer.skipped:
+            self.stdout.write(
+                f'Пропущено комментариев без поста: {importer.skipped}'
+            )
+        if not options['no_rebuild']:
+            for command in REBUILD_COMMANDS:
+                call_command(command, stdout=self.stdout)
+            cache.clear()
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts import stats
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику всех авторов.'
+
+    def handle(self, *args, **options):
+        total = 0
+        for author_id in User.objects.values_list('pk', flat=True).iterator():
+            stats.recount(author_id)
+            total += 1
+        self.stdout.write(f'Пересчитано авторов: {total}')
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from posts.models import Comment, Post
+
+
+def comments_count_subquery():
+    counts = Comment.objects.filter(
+        post=OuterRef('pk')
+    ).order_by().values('post').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики комментариев у всех постов.'
+
+    def handle(self, *args, **options):
+        updated = Post.objects.update(
+            comments_count=comments_count_subquery(),
+            version=F('version') + 1,
+        )
+        self.stdout.write(f'Пересчитано постов: {updated}')
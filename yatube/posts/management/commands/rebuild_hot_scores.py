@@ -0,0 +1,22 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from posts import trending
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает оценки ленты популярного по датам комментариев.'
+
+    def handle(self, *args, **options):
+        moments = defaultdict(list)
+        for post_id, created in Comment.objects.values_list(
+            'post_id', 'created'
+        ).iterator():
+            moments[post_id].append(created)
+        posts = list(Post.objects.only('pk', 'created'))
+        for post in posts:
+            post.hot = trending.score(post.created, moments[post.pk])
+        Post.objects.bulk_update(posts, ['hot'], batch_size=500)
+        self.stdout.write(f'Пересчитано постов: {len(posts)}')
@@ -0,0 +1,35 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from posts import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Создает уменьшенные копии для картинок, загруженных '
+        'до появления srcset, и сохраняет их габариты.'
+    )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(image_widths='')
+        done = failed = 0
+        for post in posts.iterator():
+            if not post.image.storage.exists(post.image.name):
+                continue
+            try:
+                widths = images.save_variants(post.image)
+            except OSError:
+                failed += 1
+                continue
+            Post.objects.filter(pk=post.pk).update(
+                image_width=post.image_width,
+                image_height=post.image_height,
+                image_widths=widths,
+                version=F('version') + 1,
+            )
+            done += 1
+        cache.clear()
+        self.stdout.write(
+            f'Обработано картинок: {done}, не прочитано: {failed}'
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов и комментариев.'
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError('Полнотекстовый поиск есть только в SQLite')
+        with transaction.atomic():
+            indexed = search.rebuild()
+        self.stdout.write(f'Проиндексировано записей: {indexed}')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+from posts.models import Follow, TimelineEntry
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает материализованные ленты подписок.'
+
+    def handle(self, *args, **options):
+        follows = Follow.objects.filter(
+            user__isnull=False,
+            author__isnull=False,
+        ).values_list('user_id', 'author_id')
+        with transaction.atomic():
+            TimelineEntry.objects.all().delete()
+            for user_id, author_id in follows.iterator():
+                timeline.backfill(user_id, author_id)
+        self.stdout.write(f'Перестроено подписок: {follows.count()}')
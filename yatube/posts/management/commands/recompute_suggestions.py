@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+from posts.models import Follow, Suggestion
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «Кого почитать» для пользователей, '
+        'подписки которых изменились.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересчитать всех подписчиков, а не только очередь.',
+        )
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['all']:
+            # Без подписок старые рекомендации тоже нужно убрать.
+            user_ids = set(Follow.objects.filter(
+                user__isnull=False
+            ).values_list('user_id', flat=True))
+            user_ids.update(Suggestion.objects.values_list(
+                'user_id', flat=True
+            ))
+        total = suggestions.recompute(user_ids)
+        self.stdout.write(f'Пересчитано пользователей: {total}')
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from posts import stats
+from posts.models import AuthorStats, Group, GroupStats, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет счетчики постов групп и авторов с таблицей постов '
+        'и исправляет расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправлять.',
+        )
+
+    def handle(self, *args, **options):
+        groups = self.reconcile(
+            Group.objects.annotate(actual=Count('posts')),
+            GroupStats, 'group_id', stats.recount_group, options['dry_run'],
+        )
+        authors = self.reconcile(
+            User.objects.annotate(actual=Count('posts')),
+            AuthorStats, 'author_id', stats.recount, options['dry_run'],
+        )
+        verb = 'Найдено' if options['dry_run'] else 'Исправлено'
+        self.stdout.write(
+            f'{verb} расхождений: групп {groups}, авторов {authors}'
+        )
+
+    def reconcile(self, queryset, model, field, recount, dry_run):
+        stored = dict(model.objects.values_list(field, 'posts_count'))
+        drifted = 0
+        for pk, actual in queryset.values_list('pk', 'actual').iterator():
+            # Недостающую запись пересчитает первое чтение.
+            if pk not in stored or stored[pk] == actual:
+                continue
+            drifted += 1
+            self.stdout.write(
+                f'{model._meta.model_name} {pk}: {stored[pk]} -> {actual}'
+            )
+            if not dry_run:
+                recount(pk)
+        return drifted
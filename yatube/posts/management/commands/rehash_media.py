@@ -0,0 +1,42 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from core.storage import is_content_addressed
+from posts import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов в хранилище с именами по хэшу '
+        'содержимого: одинаковые файлы сливаются, старые удаляются.'
+    )
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        names = list(Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct())
+        moved = missing = 0
+        for name in names:
+            if is_content_addressed(name):
+                continue
+            if not storage.exists(name):
+                missing += 1
+                continue
+            with storage.open(name) as source:
+                new_name = storage.save(name, source)
+            with transaction.atomic():
+                Post.objects.filter(image=name).update(
+                    image=new_name,
+                    image_widths='',
+                    version=F('version') + 1,
+                )
+            images.release(name)
+            moved += 1
+        self.stdout.write(
+            f'Перенесено файлов: {moved}, не найдено: {missing}'
+        )
+        call_command('rebuild_image_variants', stdout=self.stdout)
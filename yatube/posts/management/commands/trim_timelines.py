@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Обрезает ленты подписок до TIMELINE_DEPTH записей. '
+        'Запускается периодически: публикация ленты не обрезает.'
+    )
+
+    def handle(self, *args, **options):
+        trimmed = timeline.trim_all()
+        self.stdout.write(f'Обрезано лент: {trimmed}')
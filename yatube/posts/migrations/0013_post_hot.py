@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:59
+
+from django.db import migrations, models
+import posts.trending
+from collections import defaultdict
+
+
+def fill_hot_scores(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    moments = defaultdict(list)
+    for post_id, created in Comment.objects.values_list(
+        'post_id', 'created'
+    ).iterator():
+        moments[post_id].append(created)
+    rows = list(Post.objects.only('pk', 'created'))
+    for post in rows:
+        post.hot = posts.trending.score(post.created, moments[post.pk])
+    Post.objects.bulk_update(rows, ['hot'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_suggestions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hot',
+            field=models.FloatField(default=posts.trending.initial_score, editable=False, help_text='log2 суммы весов публикации и комментариев', verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['hot'], name='post_hot_idx'),
+        ),
+        migrations.RunPython(fill_hot_scores, migrations.RunPython.noop),
+    ]
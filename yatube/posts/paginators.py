@@ -0,0 +1,141 @@
+import base64
+import binascii
+
+from django.core.paginator import Paginator
+from django.db.models import F, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, obj):
+    """Упаковывает позицию (created, id) в непрозрачную строку."""
+    raw = f'{direction}|{obj.created.isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Распаковывает курсор. Для битого курсора возвращает None."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, created, pk = raw.split('|')
+        created = parse_datetime(created)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or created is None:
+        return None
+    return direction, created, pk
+
+
+class CursorPage:
+    """Страница курсорной паджинации, совместимая с шаблонами ленты."""
+    is_cursor = True
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __contains__(self, item):
+        return item in self.object_list
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Курсорная (keyset) паджинация по ключу (created, id).
+    Не считает COUNT(*) и не использует OFFSET: каждая страница
+    читается по индексу created начиная с позиции курсора.
+    """
+
+    def __init__(self, queryset, per_page, key=('created', 'pk')):
+        # Поля запроса, по которым идет сортировка. Их значения должны
+        # совпадать с obj.created и obj.pk, которые попадают в курсор.
+        # Курсор фильтрует по аннотациям: фильтр по пути через
+        # FilteredRelation (feed__created) добавил бы второе соединение,
+        # и сортировка ушла бы во временное дерево.
+        created, pk = key
+        self.queryset = queryset.annotate(
+            cursor_created=F(created), cursor_pk=F(pk)
+        )
+        self.per_page = per_page
+        self.created_field, self.pk_field = 'cursor_created', 'cursor_pk'
+
+    def get_page(self, cursor=None):
+        position = decode_cursor(cursor) if cursor else None
+        if position is None:
+            rows = self._fetch(self.queryset, descending=True)
+            return self._build_page(rows, has_more=False, backwards=False)
+        direction, created, pk = position
+        if direction == NEXT:
+            queryset = self.queryset.filter(self._after(created, pk, 'lt'))
+            rows = self._fetch(queryset, descending=True)
+            return self._build_page(rows, has_more=True, backwards=False)
+        queryset = self.queryset.filter(self._after(created, pk, 'gt'))
+        rows = self._fetch(queryset, descending=False)
+        rows.reverse()
+        return self._build_page(rows, has_more=True, backwards=True)
+
+    def _after(self, created, pk, lookup):
+        return Q(**{f'{self.created_field}__{lookup}': created}) | Q(**{
+            self.created_field: created,
+            f'{self.pk_field}__{lookup}': pk,
+        })
+
+    def _fetch(self, queryset, descending):
+        # F() вместо строк: сортировка по внешнему ключу не раскрывается
+        # в ordering связанной модели.
+        fields = (F(self.created_field), F(self.pk_field))
+        ordering = [
+            field.desc() if descending else field.asc() for field in fields
+        ]
+        return list(queryset.order_by(*ordering)[:self.per_page + 1])
+
+    def _build_page(self, rows, has_more, backwards):
+        overflow = len(rows) > self.per_page
+        if overflow:
+            rows = rows[1:] if backwards else rows[:-1]
+        has_next = has_more if backwards else overflow
+        has_previous = overflow if backwards else has_more
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(NEXT, rows[-1])
+        if rows and has_previous:
+            previous_cursor = encode_cursor(PREVIOUS, rows[0])
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+
+class CountedPaginator(Paginator):
+    """
+    Обычная паджинация с заранее известным числом объектов. Число берется
+    из поддерживаемого счетчика, поэтому COUNT(*) по ленте не выполняется.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.known_count = count
+
+    @cached_property
+    def count(self):
+        return self.known_count
@@ -0,0 +1,129 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+TABLE = 'posts_search'
+POST = 0
+COMMENT = 1
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_supported():
+    return connection.vendor == 'sqlite'
+
+
+def row_id(kind, object_id):
+    """Четные rowid принадлежат постам, нечетные — комментариям."""
+    return object_id * 2 + kind
+
+
+def build_match(query):
+    """Превращает ввод пользователя в безопасное выражение MATCH."""
+    words = WORD_RE.findall(query or '')
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def index(kind, object_id, post_id, text):
+    if not is_supported():
+        return
+    rowid = row_id(kind, object_id)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [rowid])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, post_id, text) VALUES (%s, %s, %s)',
+            [rowid, post_id, text],
+        )
+
+
+def remove(kind, object_id):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {TABLE} WHERE rowid = %s',
+            [row_id(kind, object_id)],
+        )
+
+
+def rebuild():
+    """Заново заполняет индекс из таблиц постов и комментариев."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, post_id, text) '
+            f'SELECT id * 2 + {POST}, id, text FROM posts_post'
+        )
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, post_id, text) '
+            f'SELECT id * 2 + {COMMENT}, post_id, text FROM posts_comment'
+        )
+        cursor.execute(f'SELECT COUNT(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
+
+
+def matching_ids(kind, query):
+    """Подзапрос с id объектов одного вида, подходящих под запрос."""
+    return RawSQL(
+        f'SELECT rowid / 2 FROM {TABLE} '
+        f'WHERE {TABLE} MATCH %s AND rowid %% 2 = %s',
+        [build_match(query), kind],
+    )
+
+
+class SearchResults:
+    """
+    Посты, найденные по тексту поста или его комментариев, по убыванию
+    релевантности (bm25). Ленивая последовательность для Paginator.
+    """
+
+    def __init__(self, query, queryset=None):
+        self.match = build_match(query)
+        if queryset is None:
+            queryset = Post.objects.select_related('author', 'group')
+        self.queryset = queryset
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self._fetch_count()
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = self.count() if index.stop is None else index.stop
+        post_ids = self._fetch_ids(start, max(stop - start, 0))
+        posts = self.queryset.in_bulk(post_ids)
+        return [posts[pk] for pk in post_ids if pk in posts]
+
+    def _fetch_count(self):
+        if not self.match or not is_supported():
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(DISTINCT post_id) FROM {TABLE} '
+                f'WHERE {TABLE} MATCH %s',
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def _fetch_ids(self, offset, limit):
+        if not self.match or not limit or not is_supported():
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id, MIN(rank) AS score FROM {TABLE} '
+                f'WHERE {TABLE} MATCH %s '
+                f'GROUP BY post_id ORDER BY score, post_id DESC '
+                f'LIMIT %s OFFSET %s',
+                [self.match, limit, offset],
+            )
+            return [post_id for post_id, _ in cursor.fetchall()]
@@ -0,0 +1,237 @@
+import time
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import (caching, graph, images, search, stats, suggestions,
+               timeline, trending)
+from .models import Comment, Follow, Group, Post, Suggestion, User
+
+
+def change_comments_count(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta,
+        version=F('version') + 1,
+    )
+
+
+def change_hot(post_id, moment, delta):
+    """
+    Добавляет вес комментария к оценке поста или убирает его. Чтение и
+    запись идут в одной транзакции, чтобы параллельные комментарии не
+    затерли друг друга.
+    """
+    with transaction.atomic():
+        row = Post.objects.select_for_update().filter(
+            pk=post_id
+        ).values_list('hot', 'created').first()
+        if row is None:
+            return
+        hot, created = row
+        weight = trending.event(moment)
+        if delta > 0:
+            hot = trending.add(hot, weight)
+        else:
+            hot = trending.remove(hot, weight, trending.event(created))
+        Post.objects.filter(pk=post_id).update(hot=hot)
+
+
+def remember_previous(instance, *fields):
+    """Запоминает прежние значения полей изменяемого объекта."""
+    instance._previous = None
+    if instance._state.adding:
+        return
+    instance._previous = type(instance).objects.filter(
+        pk=instance.pk
+    ).values_list(*fields).first()
+
+
+@receiver(pre_save, sender=Comment)
+def comment_changing(sender, instance, raw, **kwargs):
+    if not raw:
+        remember_previous(instance, 'post_id', 'author_id')
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    if created:
+        change_comments_count(instance.post_id, 1)
+        change_hot(instance.post_id, instance.created, 1)
+        stats.change(instance.author_id, comments_count=1)
+    elif previous:
+        previous_post_id, previous_author_id = previous
+        if previous_post_id != instance.post_id:
+            change_comments_count(previous_post_id, -1)
+            change_comments_count(instance.post_id, 1)
+            change_hot(previous_post_id, instance.created, -1)
+            change_hot(instance.post_id, instance.created, 1)
+            caching.invalidate_post_of_comment(previous_post_id)
+        if previous_author_id != instance.author_id:
+            stats.change(previous_author_id, comments_count=-1)
+            stats.change(instance.author_id, comments_count=1)
+            caching.invalidate_author(previous_author_id)
+    search.index(search.COMMENT, instance.pk, instance.post_id, instance.text)
+    caching.invalidate_post_of_comment(instance.post_id)
+    caching.invalidate_author(instance.author_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_comments_count(instance.post_id, -1)
+    change_hot(instance.post_id, instance.created, -1)
+    stats.change(instance.author_id, comments_count=-1)
+    search.remove(search.COMMENT, instance.pk)
+    caching.invalidate_post_of_comment(instance.post_id)
+    caching.invalidate_author(instance.author_id)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw, **kwargs):
+    if raw:
+        return
+    remember_previous(
+        instance, 'group_id', 'author_id', 'image', 'version'
+    )
+    if instance._previous:
+        # Версия считается от строки в базе, а не от экземпляра: старый
+        # экземпляр иначе повторил бы номер, под которым уже лежит
+        # карточка.
+        instance.version = instance._previous[3] + 1
+
+
+def release_image(name):
+    if name:
+        scheduled = time.time()
+        transaction.on_commit(lambda: images.release(name, scheduled))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    previous_group_id, previous_author_id, previous_image, _ = getattr(
+        instance, '_previous', None
+    ) or (None, None, None, None)
+    if previous_image != instance.image.name:
+        release_image(previous_image)
+    if created:
+        stats.change(instance.author_id, posts_count=1)
+        stats.change_group(instance.group_id, 1)
+        if instance.author_id is not None:
+            timeline.fan_out(instance)
+    else:
+        if previous_author_id != instance.author_id:
+            stats.change(previous_author_id, posts_count=-1)
+            stats.change(instance.author_id, posts_count=1)
+            caching.forget_post_author(instance.pk)
+        if previous_group_id != instance.group_id:
+            stats.change_group(previous_group_id, -1)
+            stats.change_group(instance.group_id, 1)
+    search.index(search.POST, instance.pk, instance.pk, instance.text)
+    caching.invalidate_post(
+        instance.pk,
+        [instance.group_id, previous_group_id],
+        [instance.author_id, previous_author_id],
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    stats.change(instance.author_id, posts_count=-1)
+    stats.change_group(instance.group_id, -1)
+    release_image(instance.image.name)
+    search.remove(search.POST, instance.pk)
+    caching.forget_post_author(instance.pk)
+    caching.invalidate_post(
+        instance.pk, [instance.group_id], [instance.author_id]
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    caching.invalidate_group(instance.slug)
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, raw, **kwargs):
+    if not raw:
+        remember_previous(instance, 'username', 'first_name', 'last_name')
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    graph.forget_user(instance.username)
+    previous = getattr(instance, '_previous', None)
+    if not previous:
+        return
+    # После переименования старое имя не должно вести на пользователя.
+    if previous[0] != instance.username:
+        graph.forget_user(previous[0])
+    if previous != (
+        instance.username, instance.first_name, instance.last_name
+    ):
+        # Имя и ссылка на профиль есть в карточках всех постов автора:
+        # новая версия поста меняет ключ карточки.
+        Post.objects.filter(author_id=instance.pk).update(
+            version=F('version') + 1
+        )
+        caching.invalidate_author_posts(instance.pk)
+
+
+def follow_added(user_id, author_id):
+    graph.change(user_id, author_id)
+    stats.change(author_id, followers_count=1)
+    stats.change(user_id, following_count=1)
+    if user_id and author_id:
+        timeline.backfill(user_id, author_id)
+        Suggestion.objects.filter(
+            user_id=user_id, author_id=author_id
+        ).delete()
+        suggestions.mark_stale(user_id)
+    # Профиль подписчика показывает число его подписок и рекомендации.
+    caching.invalidate_author(author_id)
+    caching.invalidate_author(user_id)
+
+
+def follow_removed(user_id, author_id):
+    graph.change(user_id, author_id)
+    stats.change(author_id, followers_count=-1)
+    stats.change(user_id, following_count=-1)
+    if user_id and author_id:
+        timeline.prune(user_id, author_id)
+        suggestions.mark_stale(user_id)
+    # Профиль подписчика показывает число его подписок и рекомендации.
+    caching.invalidate_author(author_id)
+    caching.invalidate_author(user_id)
+
+
+@receiver(pre_save, sender=Follow)
+def follow_changing(sender, instance, raw, **kwargs):
+    if not raw:
+        remember_previous(instance, 'user_id', 'author_id')
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw, **kwargs):
+    """Подписки, переназначенные через админку, переносятся целиком."""
+    if raw:
+        return
+    previous = getattr(instance, '_previous', None)
+    current = (instance.user_id, instance.author_id)
+    if created:
+        follow_added(*current)
+    elif previous and previous != current:
+        follow_removed(*previous)
+        follow_added(*current)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    follow_removed(instance.user_id, instance.author_id)
@@ -0,0 +1,70 @@
+from django.db.models import F
+
+from .models import AuthorStats, Comment, Follow, GroupStats, Post
+
+
+def change(author_id, **deltas):
+    """
+    Сдвигает счетчики автора. Отсутствующую запись не создает: она
+    появится при первом чтении через get_stats.
+    """
+    if author_id is None:
+        return
+    AuthorStats.objects.filter(author_id=author_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def recount(author_id):
+    """Пересчитывает счетчики автора по исходным таблицам."""
+    stats, _ = AuthorStats.objects.update_or_create(
+        author_id=author_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=author_id).count(),
+            'comments_count': Comment.objects.filter(
+                author_id=author_id
+            ).count(),
+            'followers_count': Follow.objects.filter(
+                author_id=author_id
+            ).count(),
+            'following_count': Follow.objects.filter(
+                user_id=author_id
+            ).count(),
+        },
+    )
+    return stats
+
+
+def get_stats(author):
+    if author is None:
+        return None
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        return recount(author.pk)
+
+
+def change_group(group_id, delta):
+    """Сдвигает число постов группы. Запись, как и у автора, не создает."""
+    if group_id is None:
+        return
+    GroupStats.objects.filter(group_id=group_id).update(
+        posts_count=F('posts_count') + delta
+    )
+
+
+def recount_group(group_id):
+    stats, _ = GroupStats.objects.update_or_create(
+        group_id=group_id,
+        defaults={
+            'posts_count': Post.objects.filter(group_id=group_id).count(),
+        },
+    )
+    return stats
+
+
+def get_group_stats(group):
+    try:
+        return group.stats
+    except GroupStats.DoesNotExist:
+        return recount_group(group.pk)
@@ -0,0 +1,100 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from . import caching
+from .models import Follow, StaleSuggestions, Suggestion
+
+
+class CoFollowGraph:
+    """
+    Разреженная матрица подписок «пользователь × автор» в виде словарей
+    множеств. Сходство авторов — косинус между их столбцами:
+    общие подписчики / sqrt(подписчиков a * подписчиков b).
+    """
+
+    def __init__(self, pairs):
+        self.follows = defaultdict(set)
+        self.followers = defaultdict(set)
+        for user_id, author_id in pairs:
+            self.follows[user_id].add(author_id)
+            self.followers[author_id].add(user_id)
+        self._similar = {}
+
+    @classmethod
+    def load(cls):
+        return cls(Follow.objects.filter(
+            user__isnull=False, author__isnull=False
+        ).values_list('user_id', 'author_id').iterator())
+
+    def similar(self, author_id):
+        """Строка A^T A для автора, нормированная до косинуса."""
+        if author_id not in self._similar:
+            common = Counter()
+            for user_id in self.followers[author_id]:
+                common.update(self.follows[user_id])
+            del common[author_id]
+            size = len(self.followers[author_id])
+            self._similar[author_id] = {
+                other_id: count / math.sqrt(
+                    size * len(self.followers[other_id])
+                )
+                for other_id, count in common.items()
+            }
+        return self._similar[author_id]
+
+    def suggest(self, user_id, count):
+        """Лучшие count авторов, на которых пользователь не подписан."""
+        followed = self.follows.get(user_id, set())
+        scores = Counter()
+        for author_id in followed:
+            scores.update(self.similar(author_id))
+        for author_id in followed | {user_id}:
+            scores.pop(author_id, None)
+        return heapq.nlargest(
+            count, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+
+
+def mark_stale(user_id):
+    StaleSuggestions.objects.bulk_create(
+        [StaleSuggestions(user_id=user_id)], ignore_conflicts=True
+    )
+
+
+def recompute(user_ids=None):
+    """
+    Пересчитывает рекомендации пользователей из очереди StaleSuggestions,
+    а с явным списком — только этих пользователей. Граф читается целиком,
+    записываются только рекомендации пересчитываемых пользователей.
+    Возвращает число пересчитанных пользователей.
+    """
+    if user_ids is None:
+        user_ids = list(StaleSuggestions.objects.values_list(
+            'user_id', flat=True
+        ))
+    graph = CoFollowGraph.load()
+    for user_id in user_ids:
+        suggestions = [
+            Suggestion(user_id=user_id, author_id=author_id, score=score)
+            for author_id, score in graph.suggest(
+                user_id, settings.SUGGESTIONS_COUNT
+            )
+        ]
+        with transaction.atomic():
+            Suggestion.objects.filter(user_id=user_id).delete()
+            Suggestion.objects.bulk_create(suggestions)
+            StaleSuggestions.objects.filter(user_id=user_id).delete()
+        caching.invalidate_author(user_id)
+    return len(user_ids)
+
+
+def get_suggestions(user):
+    if not user.is_authenticated:
+        return []
+    return list(
+        Suggestion.objects.filter(user=user).select_related('author')
+    )
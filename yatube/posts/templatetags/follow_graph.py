@@ -0,0 +1,16 @@
+from django import template
+
+from posts import graph
+
+register = template.Library()
+
+
+@register.filter
+def follows(user, author):
+    """{% if request.user|follows:author %} — по кэшу подписок."""
+    return graph.is_following(user, author)
+
+
+@register.filter
+def follower_count(author):
+    return graph.follower_count(author.pk)
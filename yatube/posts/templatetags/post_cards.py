@@ -0,0 +1,13 @@
+from django import template
+
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Карточки постов страницы из кэша фрагментов: пары (пост, html)."""
+    match = context['request'].resolver_match
+    show_author = not match or match.view_name != 'posts:profile'
+    return render_cards(posts, show_author)
@@ -0,0 +1,25 @@
+from django import template
+from django.conf import settings
+
+from posts import images
+
+register = template.Library()
+
+CARD_SIZES = '(max-width: 960px) 100vw, 960px'
+
+
+@register.inclusion_tag('includes/posts/image.html')
+def post_image(post, sizes=CARD_SIZES):
+    """Картинка поста с srcset, размерами и ленивой загрузкой."""
+    context = {'post': post, 'sizes': sizes, 'srcset': None}
+    # Старые загрузки без копий показываются миниатюрой sorl. Новая
+    # загрузка, пока пул режет ее копии, отдается сама по себе.
+    if post.image and post.image_width and (
+        post.image_widths
+        or post.image_width <= min(settings.IMAGE_WIDTHS)
+        or images.is_master(post.image.name)
+    ):
+        context['srcset'] = images.srcset(
+            post.image, post.image_widths, post.image_width
+        )
+    return context
@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+from posts import benchmark
+from posts.models import Comment, Follow, Group, Post
+from posts.stats import get_group_stats
+
+User = get_user_model()
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class TransferCommandsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='JustName')
+        cls.reader = User.objects.create_user(username='AnotherName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Текст тестового поста',
+            author=cls.user,
+            group=cls.group,
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_export_import_round_trip(self):
+        """Выгрузка и загрузка JSONL переносят данные с новыми ключами."""
+        path = os.path.join(TEMP_DIR, 'dump.jsonl')
+        call_command('export_jsonl', path, stdout=StringIO())
+        created = Post.objects.get().created
+        get_group_stats(self.group)
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        User.objects.filter(username='AnotherName').delete()
+        call_command('import_jsonl', path, batch_size=1, stdout=StringIO())
+        post = Post.objects.get()
+        self.assertEqual(post.text, 'Текст тестового поста')
+        self.assertEqual(post.created, created)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(Group.objects.count(), 1)
+        self.assertEqual(get_group_stats(post.group).posts_count, 1)
+        self.assertEqual(post.comments.get().author.username, 'AnotherName')
+        self.assertEqual(post.comments_count, 1)
+        self.assertTrue(Follow.objects.filter(
+            user__username='AnotherName', author=self.user
+        ).exists())
+        self.assertEqual(post.timeline_entries.count(), 1)
+
+
+@override_settings(MEDIA_ROOT=TEMP_DIR)
+class RehashMediaCommandTest(TestCase):
+
+    def test_flat_files_moved_to_content_addressed_names(self):
+        flat = FileSystemStorage(location=TEMP_DIR)
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x02\x00'
+            b'\x01\x00\x80\x00\x00\x00\x00\x00'
+            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+            b'\x0A\x00\x3B'
+        )
+        flat.save('posts/old.gif', ContentFile(small_gif))
+        flat.save('posts/copy.gif', ContentFile(small_gif))
+        user = User.objects.create_user(username='MediaUser')
+        Post.objects.bulk_create([
+            Post(text='Старый', author=user, image='posts/old.gif'),
+            Post(text='Копия', author=user, image='posts/copy.gif'),
+        ])
+        call_command('rehash_media', stdout=StringIO())
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertRegex(name, r'^posts/\w\w/\w\w/[0-9a-f]{64}\.gif$')
+        self.assertTrue(flat.exists(name))
+        self.assertFalse(flat.exists('posts/old.gif'))
+        self.assertFalse(flat.exists('posts/copy.gif'))
+
+
+class BenchmarkTest(TestCase):
+
+    def test_empty_summary(self):
+        summary = benchmark.summarize([], 1.0, 4)
+        self.assertEqual(summary['requests'], 0)
+        self.assertIsNone(summary['p99_ms'])
+        self.assertIsNone(summary['queries_avg'])
+
+    def test_fewer_requests_than_threads_rejected(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                'benchmark_views', requests=2, concurrency=4,
+                stdout=StringIO(),
+            )
@@ -1,11 +1,18 @@
 import shutil
 import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
 from django.urls import reverse
+from PIL import Image
+from posts import images, thumbnails
+from posts.forms import PostForm
 from posts.models import Group, Post
 
 User = get_user_model()
@@ -69,7 +76,9 @@ class TestForms(TestCase):
             )
         )
         self.assertEqual(Post.objects.count(), posts_count + 1)
-        self.assertTrue(Post.objects.filter(image='posts/small.gif').exists())
+        self.assertTrue(Post.objects.filter(
+            image__startswith='posts/', image__endswith='.webp'
+        ).exists())
 
     def test_forms_edit_post(self):
         """Валидная форма изменения записи изменяет запись в Post."""
@@ -106,7 +115,6 @@ class TestForms(TestCase):
                 kwargs={'post_id': TestForms.post.id}
             ),
             data=form_data,
-            follow=True,
         )
         response = self.authorized_client.get(
             reverse(
@@ -118,3 +126,142 @@ class TestForms(TestCase):
             response.context['comments'][0].text,
             'Test comment 1'
         )
+
+
+def make_jpeg(width, height):
+    image = Image.new('RGB', (width, height), 'red')
+    exif = Image.Exif()
+    exif[0x010F] = 'PhoneMaker'
+    output = BytesIO()
+    image.save(output, format='JPEG', exif=exif)
+    return SimpleUploadedFile(
+        'photo.jpg', output.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageIngestionTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='FormsUserName')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_upload_reencoded_with_variants(self):
+        """Загрузка перекодируется без EXIF и получает копии для srcset."""
+        form = PostForm(
+            data={'text': 'Пост с фото'},
+            files={'image': make_jpeg(2400, 1200)},
+            instance=Post(author=self.user),
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        post = form.save()
+        self.addCleanup(
+            thumbnails._pending.discard, f'variants:{post.image.name}'
+        )
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual(
+            (post.image_width, post.image_height), (1920, 960)
+        )
+        url = reverse('posts:post_detail', kwargs={'post_id': post.id})
+        # Пока пул не нарезал копии, страница отдает саму картинку.
+        self.assertEqual(post.image_widths, '')
+        response = Client().get(url)
+        self.assertContains(response, '.webp 1920w')
+        self.assertNotContains(response, '_w320.webp')
+        thumbnails.make_variants(post.image.name)
+        post.refresh_from_db()
+        self.assertEqual(post.image_widths, '320,640,960')
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'WEBP')
+            self.assertNotIn('exif', stored.info)
+        for width in (320, 640, 960):
+            name = images.variant_name(post.image.name, width)
+            self.assertTrue(post.image.storage.exists(name))
+        response = Client().get(url)
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, '_w320.webp 320w')
+
+    @override_settings(IMAGE_MAX_BYTES=1024)
+    def test_oversized_upload_rejected(self):
+        form = PostForm(
+            data={'text': 'Пост с фото'},
+            files={'image': make_jpeg(800, 600)},
+        )
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+
+class WaitingExecutor:
+    """Пул, который дожидается задачи: копии готовы к следующей строке."""
+
+    def submit(self, task, *args):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(task, *args)
+
+
+class SharedImageTests(TransactionTestCase):
+
+    def setUp(self):
+        executor = thumbnails._executor
+        thumbnails._executor = WaitingExecutor()
+        self.addCleanup(setattr, thumbnails, '_executor', executor)
+        media_root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def create_post(self, user):
+        form = PostForm(
+            data={'text': 'Мем'},
+            files={'image': make_jpeg(700, 400)},
+            instance=Post(author=user),
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        return form.save()
+
+    def test_variants_made_in_pool_after_commit(self):
+        user = User.objects.create(username='FormsUserName')
+        post = self.create_post(user)
+        post.refresh_from_db()
+        self.assertEqual(post.image_widths, '320,640')
+        for width in (320, 640):
+            name = images.variant_name(post.image.name, width)
+            self.assertTrue(post.image.storage.exists(name))
+
+    @override_settings(IMAGE_RELEASE_GRACE=0)
+    def test_identical_uploads_share_file_until_last_post(self):
+        """Одинаковые картинки лежат одним файлом до удаления всех постов."""
+        user = User.objects.create(username='FormsUserName')
+        first, second = self.create_post(user), self.create_post(user)
+        self.assertEqual(first.image.name, second.image.name)
+        storage, name = first.image.storage, first.image.name
+        variant = images.variant_name(name, 640)
+        first.delete()
+        self.assertTrue(storage.exists(name))
+        second.text = 'Без картинки'
+        second.image = None
+        second.save()
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(storage.exists(variant))
+
+    @override_settings(IMAGE_RELEASE_GRACE=0)
+    def test_reupload_after_release_scheduled_keeps_file(self):
+        """Повторная загрузка после освобождения сохраняет файл."""
+        storage = Post._meta.get_field('image').storage
+        with make_jpeg(700, 400) as upload:
+            content = images.ingest(upload)
+        name = storage.save('posts/first.webp', content)
+        released = time.time() - 1
+        # Та же картинка пришла в посте, который еще не закоммичен.
+        self.assertEqual(storage.save('posts/again.webp', content), name)
+        images.release(name, released)
+        self.assertTrue(storage.exists(name))
+        images.release(name, time.time() + 1)
+        self.assertFalse(storage.exists(name))
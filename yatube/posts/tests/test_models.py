@@ -1,6 +1,13 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
-from posts.models import Group, Post
+from posts.stats import get_group_stats, get_stats
+from posts.models import (AuthorStats, Comment, Follow, Group, GroupStats,
+                          Post, StaleSuggestions, Suggestion)
+from posts import feeds
+from posts.suggestions import CoFollowGraph
 
 User = get_user_model()
 
@@ -77,3 +84,195 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+
+class CommentsCountTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='authUSERNAME')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        cls.another_post = Post.objects.create(text='Пост 2', author=cls.user)
+
+    def get_count(self, post):
+        return Post.objects.get(pk=post.pk).comments_count
+
+    def test_counter_follows_comments(self):
+        """Счетчик комментариев следует за созданием, переносом и удалением."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        Comment.objects.create(post=self.post, author=self.user, text='Еще')
+        self.assertEqual(self.get_count(self.post), 2)
+        comment.post = self.another_post
+        comment.save()
+        self.assertEqual(self.get_count(self.post), 1)
+        self.assertEqual(self.get_count(self.another_post), 1)
+        Comment.objects.filter(post=self.post).delete()
+        self.assertEqual(self.get_count(self.post), 0)
+
+    def test_rebuild_command(self):
+        """Команда rebuild_comments_count восстанавливает счетчики."""
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        Post.objects.update(comments_count=42)
+        call_command('rebuild_comments_count', stdout=StringIO())
+        self.assertEqual(self.get_count(self.post), 1)
+        self.assertEqual(self.get_count(self.another_post), 0)
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='authUSERNAME')
+        cls.reader = User.objects.create_user(username='readerUSERNAME')
+
+    def get_stats(self, user):
+        return AuthorStats.objects.get(author=user)
+
+    def test_stats_follow_writes(self):
+        """Статистика автора следует за постами, комментариями и подписками."""
+        get_stats(self.author)
+        get_stats(self.reader)
+        post = Post.objects.create(text='Пост', author=self.author)
+        Post.objects.create(text='Пост 2', author=self.author)
+        Comment.objects.create(post=post, author=self.reader, text='Да')
+        Follow.objects.create(user=self.reader, author=self.author)
+        author_stats = self.get_stats(self.author)
+        reader_stats = self.get_stats(self.reader)
+        self.assertEqual(author_stats.posts_count, 2)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(reader_stats.comments_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        post.delete()
+        Follow.objects.all().delete()
+        author_stats = self.get_stats(self.author)
+        reader_stats = self.get_stats(self.reader)
+        self.assertEqual(author_stats.posts_count, 1)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(reader_stats.comments_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+
+    def test_stats_created_on_first_read(self):
+        Post.objects.bulk_create([
+            Post(text='Пост', author=self.author) for _ in range(3)
+        ])
+        self.assertEqual(get_stats(self.author).posts_count, 3)
+
+
+class GroupStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='authUSERNAME')
+        cls.group = Group.objects.create(title='Первая', slug='first')
+        cls.other = Group.objects.create(title='Вторая', slug='second')
+
+    def get_count(self, group):
+        return GroupStats.objects.get(group=group).posts_count
+
+    def test_counter_follows_posts(self):
+        """Счетчик группы следует за созданием, переносом и удалением."""
+        get_group_stats(self.group)
+        get_group_stats(self.other)
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group
+        )
+        Post.objects.create(text='Пост 2', author=self.author)
+        self.assertEqual(self.get_count(self.group), 1)
+        post.group = self.other
+        post.save()
+        self.assertEqual(self.get_count(self.group), 0)
+        self.assertEqual(self.get_count(self.other), 1)
+        post.delete()
+        self.assertEqual(self.get_count(self.other), 0)
+
+    def test_reconcile_command_fixes_drift(self):
+        Post.objects.create(text='Пост', author=self.author, group=self.group)
+        get_stats(self.author)
+        get_group_stats(self.group)
+        GroupStats.objects.filter(group=self.group).update(posts_count=7)
+        AuthorStats.objects.filter(author=self.author).update(posts_count=0)
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('групп 1, авторов 1', out.getvalue())
+        self.assertEqual(self.get_count(self.group), 7)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.get_count(self.group), 1)
+        self.assertEqual(get_stats(self.author).posts_count, 1)
+
+
+class SuggestionsTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.users = [
+            User.objects.create_user(username=f'user{number}')
+            for number in range(5)
+        ]
+
+    def follow(self, user, author):
+        Follow.objects.create(user=self.users[user], author=self.users[author])
+
+    def suggested(self, user):
+        return list(Suggestion.objects.filter(
+            user=self.users[user]
+        ).values_list('author__username', flat=True))
+
+    def test_cosine_similarity(self):
+        graph = CoFollowGraph([(1, 10), (1, 20), (2, 10), (2, 20), (3, 20)])
+        self.assertAlmostEqual(graph.similar(10)[20], 2 / 6 ** 0.5)
+        self.assertEqual(graph.suggest(3, 5), [(10, 2 / 6 ** 0.5)])
+        self.assertEqual(graph.suggest(1, 5), [])
+
+    def test_recompute_only_stale_users(self):
+        """Пересчитываются только пользователи, чьи подписки менялись."""
+        self.follow(0, 3)
+        self.follow(0, 4)
+        self.follow(1, 3)
+        call_command('recompute_suggestions', stdout=StringIO())
+        self.assertEqual(self.suggested(1), ['user4'])
+        self.assertFalse(StaleSuggestions.objects.exists())
+        self.follow(2, 4)
+        out = StringIO()
+        call_command('recompute_suggestions', stdout=out)
+        self.assertIn('Пересчитано пользователей: 1', out.getvalue())
+        self.assertEqual(self.suggested(2), ['user3'])
+
+    def test_follow_removes_suggestion(self):
+        self.follow(0, 3)
+        self.follow(0, 4)
+        self.follow(1, 3)
+        call_command('recompute_suggestions', stdout=StringIO())
+        self.follow(1, 4)
+        self.assertEqual(self.suggested(1), [])
+
+
+class HotScoreTest(TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='authUSERNAME')
+
+    def test_comments_raise_post_in_hot_feed(self):
+        """Комментарии поднимают пост, удаление возвращает оценку."""
+        old = Post.objects.create(text='Старый', author=self.author)
+        new = Post.objects.create(text='Новый', author=self.author)
+        self.assertEqual(list(feeds.hot_posts()), [new, old])
+        initial = Post.objects.get(pk=old.pk).hot
+        comments = [
+            Comment.objects.create(post=old, author=self.author, text='Да')
+            for _ in range(2)
+        ]
+        self.assertEqual(list(feeds.hot_posts()), [old, new])
+        for comment in comments:
+            comment.delete()
+        self.assertAlmostEqual(Post.objects.get(pk=old.pk).hot, initial)
+
+    def test_rebuild_matches_incremental_scores(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        for _ in range(3):
+            Comment.objects.create(post=post, author=self.author, text='Да')
+        hot = Post.objects.get(pk=post.pk).hot
+        call_command('rebuild_hot_scores', stdout=StringIO())
+        self.assertAlmostEqual(Post.objects.get(pk=post.pk).hot, hot, 3)
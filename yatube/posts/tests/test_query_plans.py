@@ -0,0 +1,105 @@
+import random
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from posts import benchmark
+from posts.models import Comment, Follow, Group, User
+
+HOT_TABLES = (
+    'posts_post', 'posts_comment', 'posts_follow', 'posts_timelineentry'
+)
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def bad_steps(plan):
+    """Полный проход таблицы без индекса или сортировка во временном дереве."""
+    return [
+        step for step in plan
+        if 'TEMP B-TREE' in step
+        or (step.startswith('SCAN ') and 'USING' not in step
+            and 'CONSTANT ROW' not in step)
+    ]
+
+
+class QueryPlanTests(TestCase):
+    """Горячие запросы представлений должны идти по индексам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        benchmark.seed(
+            users=20, groups=3, posts=300, comments=300,
+            follows_per_user=5, rng=random.Random(0),
+        )
+        call_command('rebuild_timelines', stdout=StringIO())
+        cls.follower = Follow.objects.select_related('user').first().user
+        cls.author = User.objects.filter(posts__isnull=False).first()
+        cls.group = Group.objects.first()
+        comment = Comment.objects.first()
+        cls.post_id = comment.post_id
+        # Вторая страница комментариев, чтобы было куда идти по курсору.
+        Comment.objects.bulk_create(
+            Comment(post_id=cls.post_id, author=comment.author, text='Да')
+            for _ in range(settings.COMMENTS_PAGE_SIZE)
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(QueryPlanTests.follower)
+
+    def urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:hot'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post_id}),
+            reverse('posts:post_comments', kwargs={'post_id': self.post_id}),
+            reverse('posts:follow_index'),
+        ]
+
+    def get_with_plans(self, url, params):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(
+                table in sql for table in HOT_TABLES
+            ):
+                continue
+            with self.subTest(url=url, params=params, sql=sql):
+                self.assertEqual(bad_steps(query_plan(sql)), [])
+        return response
+
+    def next_page(self, response):
+        """Параметры следующей страницы: курсор из ответа или номер."""
+        page = response.context.get('page_obj')
+        if page is None:
+            page = response.context['comments']
+        if not getattr(page, 'is_cursor', False):
+            return {'page': 2}
+        self.assertIsNotNone(page.next_cursor, response.request['PATH_INFO'])
+        return {'cursor': page.next_cursor}
+
+    def assert_plans_use_indexes(self):
+        for url in self.urls():
+            response = self.get_with_plans(url, {})
+            self.get_with_plans(url, self.next_page(response))
+
+    def test_hot_queries_use_indexes(self):
+        self.assert_plans_use_indexes()
+
+    @override_settings(PAGINATOR_CURSOR_MODE=True)
+    def test_hot_queries_use_indexes_in_cursor_mode(self):
+        self.assert_plans_use_indexes()
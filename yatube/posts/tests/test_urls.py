@@ -1,10 +1,13 @@
+import warnings
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.cache.backends.base import CacheKeyWarning
 from django.test import Client, TestCase
 from django.urls import reverse
-from posts.models import Group, Post
+from posts import caching
+from posts.models import Comment, Group, Post
 
 User = get_user_model()
 
@@ -122,13 +125,14 @@ class URLTests(TestCase):
         }
         for url, template in url_template.items():
             with self.subTest(url=url):
+                cache.clear()
                 response = self.authorized_client.get(url, follow=True)
                 self.assertTemplateUsed(response, template)
 
     def test_urls_index_is_cached(self):
         response1 = self.authorized_client.get(reverse('posts:index'))
         content1 = response1.content
-        Post.objects.all().delete()
+        Post.objects.all().update(text='Изменено в обход сигналов')
         response2 = self.authorized_client.get(reverse('posts:index'))
         content2 = response2.content
         self.assertEqual(content1, content2)
@@ -136,3 +140,81 @@ class URLTests(TestCase):
         response3 = self.authorized_client.get(reverse('posts:index'))
         content3 = response3.content
         self.assertNotEqual(content1, content3)
+
+    def test_cache_invalidated_on_write(self):
+        """Запись поста или комментария сразу сбрасывает кэш страниц."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'JustName'}),
+            reverse('posts:post_detail', kwargs={'post_id': URLTests.post.id}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                content1 = self.authorized_client.get(url).content
+                Comment.objects.create(
+                    post=URLTests.post,
+                    author=URLTests.user,
+                    text=f'Комментарий для {url}',
+                )
+                content2 = self.authorized_client.get(url).content
+                self.assertNotEqual(content1, content2)
+        group_url = reverse('posts:group_list', kwargs={'slug': 'test_group'})
+        content1 = self.authorized_client.get(group_url).content
+        post = URLTests.post
+        post.group = Group.objects.get(slug='test_group')
+        post.save()
+        content2 = self.authorized_client.get(group_url).content
+        self.assertNotEqual(content1, content2)
+
+    def test_cached_post_page_skips_database(self):
+        """Страница поста из кэша не ходит в базу, но видит новые посты."""
+        url = reverse('posts:post_detail', args=[URLTests.post.id])
+        self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            self.guest_client.get(url)
+        scope = caching.post_scope(URLTests.post.id)
+        generations = caching.get_generations([scope])
+        Post.objects.create(text='Второй пост', author=URLTests.user)
+        # Новый пост автора не сдвигает поколения его остальных постов.
+        self.assertEqual(caching.get_generations([scope]), generations)
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['author_stats'].posts_count, 2)
+
+    def test_scope_keys_safe_for_memcached(self):
+        """Слаг не из ASCII не попадает в ключ кэша как есть."""
+        scope = caching.group_scope('Тестовый слаг')
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', CacheKeyWarning)
+            caching.bump(scope)
+            caching.get_generations([scope])
+
+    def test_cached_pages_not_shared_between_visitors(self):
+        """Кэш страниц не отдает чужое имя, кнопки и CSRF-токен."""
+        bob = Client(enforce_csrf_checks=True)
+        bob.force_login(URLTests.user2)
+        post_url = reverse('posts:post_detail', args=[URLTests.post.id])
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=['JustName']),
+            post_url,
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                self.authorized_client.get(url)
+                response = bob.get(url)
+                self.assertContains(response, '/> AnotherName')
+                self.assertNotContains(response, '/> JustName')
+                response = self.guest_client.get(url)
+                self.assertNotContains(response, '/> JustName')
+        self.assertIn('csrftoken', bob.cookies)
+        response = bob.post(
+            reverse('posts:add_comment', args=[URLTests.post.id]),
+            {
+                'text': 'Комментарий Боба',
+                'csrfmiddlewaretoken': bob.cookies['csrftoken'].value,
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            Comment.objects.filter(text='Комментарий Боба').exists()
+        )
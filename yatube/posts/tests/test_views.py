@@ -1,14 +1,22 @@
 import shutil
 import tempfile
+from io import StringIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
+from django.core.management import call_command
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import connection
+from django.template import Context, Template
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Follow, Group, Post
+from posts import cards, graph, thumbnails
+from posts.models import Comment, Follow, Group, Post, Suggestion
 from posts.forms import PostForm
+from sorl.thumbnail import get_thumbnail
 
 User = get_user_model()
 
@@ -65,6 +73,49 @@ class PostPagesTests(TestCase):
         self.post_id = PostPagesTests.post.id
         cache.clear()
 
+    def test_thumbnail_pending_falls_back_to_source(self):
+        """Пока миниатюра не готова, шаблон получает исходную картинку."""
+        image = PostPagesTests.post.image
+        geometry, options = settings.POST_THUMBNAILS[0]
+        pending = get_thumbnail(image, geometry, **options)
+        self.assertEqual(pending.name, image.name)
+        thumbnails.generate(image.name, settings.POST_THUMBNAILS)
+        ready = get_thumbnail(image, geometry, **options)
+        self.assertNotEqual(ready.name, image.name)
+        self.assertTrue(ready.exists())
+
+    def test_legacy_image_schedules_thumbnail(self):
+        """Старая картинка без копий srcset ставит миниатюру в очередь."""
+        post = Post.objects.get(pk=self.post_id)
+        post.image_width, post.image_widths = 2000, ''
+        geometry, options = settings.POST_THUMBNAILS[0]
+        name = thumbnails.thumbnail_name(
+            thumbnails.source_file(post.image.name), geometry, options
+        )
+        thumbnails._pending.discard(name)
+        self.addCleanup(thumbnails._pending.discard, name)
+        html = Template('{% load post_images %}{% post_image post %}').render(
+            Context({'post': post})
+        )
+        self.assertNotIn('srcset', html)
+        self.assertIn(name, thumbnails._pending)
+
+    def test_thumbnail_sizes_scheduled_separately(self):
+        """Другой размер той же картинки не отсекается как повтор."""
+        image = PostPagesTests.post.image.name
+        source = thumbnails.source_file(image)
+        geometries = [('960x339', {'crop': 'center'}), ('100x100', {})]
+        names = [
+            thumbnails.thumbnail_name(source, geometry, options)
+            for geometry, options in geometries
+        ]
+        self.assertNotEqual(names[0], names[1])
+        for name in names:
+            self.addCleanup(thumbnails._pending.discard, name)
+        thumbnails.schedule(image, geometries[:1])
+        thumbnails.schedule(image, geometries)
+        self.assertTrue(set(names) <= thumbnails._pending)
+
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
         template_reverse_name = {
@@ -223,6 +274,21 @@ class PostPagesTests(TestCase):
         ).exists()
         self.assertFalse(unfollow)
 
+    def test_follow_page_shows_suggestions(self):
+        """Лента подписок показывает посчитанные рекомендации."""
+        suggested = User.objects.create_user(username='Suggested')
+        Suggestion.objects.create(
+            user=PostPagesTests.user, author=suggested, score=0.5
+        )
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [item.author for item in response.context['suggestions']],
+            [suggested],
+        )
+        self.assertContains(
+            response, reverse('posts:profile', args=['Suggested'])
+        )
+
 
 class PaginatorViewsTest(TestCase):
     """Паджинатор правильно разбивает страницы."""
@@ -291,3 +357,395 @@ class PaginatorViewsTest(TestCase):
         client.force_login(PaginatorViewsTest.another_user)
         url = reverse('posts:follow_index')
         self.paginator_pages_test(url, client)
+
+    def test_counters_replace_count_query(self):
+        """Группа и профиль берут число постов из счетчиков."""
+        urls = (
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'JustName'}),
+        )
+        for url in urls:
+            # Первое чтение создает запись счетчика.
+            self.guest_client.get(url)
+            cache.clear()
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(url + '?page=2')
+                self.assertEqual(
+                    response.context['page_obj'].paginator.count, TEST_COUNT
+                )
+                self.assertFalse([
+                    query for query in queries
+                    if 'COUNT(' in query['sql'].upper()
+                    and '"posts_post"' in query['sql']
+                ])
+
+
+@override_settings(PAGINATOR_CURSOR_MODE=True)
+class CursorPaginatorViewsTest(TestCase):
+    """Курсорный паджинатор проходит ленту без пропусков и повторов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='JustName')
+        objs = [
+            Post(text=f'Текст тестового поста{x}', author=cls.user)
+            for x in range(TEST_COUNT)
+        ]
+        Post.objects.bulk_create(objs=objs)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+
+    def test_cursor_pages_cover_feed(self):
+        url = reverse('posts:index')
+        page_obj = self.guest_client.get(url).context['page_obj']
+        self.assertFalse(page_obj.has_previous())
+        seen = [post.id for post in page_obj]
+        pages = [page_obj]
+        while page_obj.has_next():
+            response = self.guest_client.get(
+                url, {'cursor': page_obj.next_cursor}
+            )
+            page_obj = response.context['page_obj']
+            seen.extend(post.id for post in page_obj)
+            pages.append(page_obj)
+        expected = list(
+            Post.objects.order_by('-created', '-id').values_list(
+                'id', flat=True
+            )
+        )
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages[-1]), TEST_COUNT % settings.PAGINATOR_CONST)
+        response = self.guest_client.get(
+            url, {'cursor': page_obj.previous_cursor}
+        )
+        self.assertEqual(
+            [post.id for post in response.context['page_obj']],
+            [post.id for post in pages[-2]],
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:index'), {'cursor': 'broken'}
+        )
+        self.assertEqual(
+            len(response.context['page_obj']), settings.PAGINATOR_CONST
+        )
+
+
+@override_settings(TIMELINE_DEPTH=5)
+class TimelineTest(TestCase):
+    """Лента подписок заполняется, обрезается и чистится."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='JustName')
+        cls.author = User.objects.create_user(username='AnotherName')
+        Post.objects.bulk_create([
+            Post(text=f'Старый пост{x}', author=cls.author)
+            for x in range(3)
+        ])
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(TimelineTest.user)
+
+    def get_feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_timeline_follow_fan_out_and_unfollow(self):
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'AnotherName'}
+        ))
+        self.assertEqual(len(self.get_feed()), 3)
+        new_posts = [
+            Post.objects.create(text=f'Новый пост{x}', author=self.author)
+            for x in range(4)
+        ]
+        # Публикация ленты не обрезает, это делает периодическая команда.
+        self.assertEqual(len(self.get_feed()), 7)
+        call_command('trim_timelines', stdout=StringIO())
+        feed = self.get_feed()
+        self.assertEqual(len(feed), 5)
+        self.assertEqual(feed[0], new_posts[-1])
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'AnotherName'}
+        ))
+        self.assertEqual(self.get_feed(), [])
+
+
+class SearchViewsTest(TestCase):
+    """Поиск находит посты по тексту постов и комментариев."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='JustName')
+        cls.post = Post.objects.create(
+            text='Рецепт борща со сметаной', author=cls.user
+        )
+        cls.commented_post = Post.objects.create(
+            text='Просто пост', author=cls.user
+        )
+        Comment.objects.create(
+            post=cls.commented_post, author=cls.user, text='А где борщ?'
+        )
+        Post.objects.create(text='Совсем другой пост', author=cls.user)
+
+    def search(self, query):
+        response = Client().get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_search_posts_and_comments(self):
+        self.assertEqual(self.search('борща'), [self.post])
+        self.assertEqual(self.search('БОРЩ'), [self.commented_post])
+        self.assertEqual(self.search('"неизвестно'), [])
+
+    def test_search_index_follows_edits(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Рецепт щей'
+        post.save()
+        self.assertEqual(self.search('борща'), [])
+        self.assertEqual(self.search('щей'), [post])
+        post.delete()
+        self.assertEqual(self.search('щей'), [])
+
+
+@override_settings(COMMENTS_PAGE_SIZE=5)
+class CommentsPaginationTest(TestCase):
+    """Комментарии на странице поста отдаются порциями."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='JustName')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий{x}')
+            for x in range(7)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_comments_first_page_and_fragment(self):
+        client = Client()
+        response = client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 5)
+        self.assertTrue(comments.has_next())
+        response = client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'cursor': comments.next_cursor},
+        )
+        self.assertTemplateUsed(response, 'includes/posts/comment_list.html')
+        self.assertEqual(len(response.context['comments']), 2)
+        self.assertNotContains(response, 'js-more-comments')
+
+    def test_comments_of_unknown_post_not_found(self):
+        response = Client().get(
+            reverse('posts:post_comments', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+class PostCardCacheTest(TestCase):
+    """Карточки постов берутся из кэша до правки или комментария."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='JustName')
+        cls.post = Post.objects.create(text='Текст поста', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_card_cached_until_post_changes(self):
+        posts = [Post.objects.get(pk=self.post.pk)]
+        first = cards.render_cards(posts)[0][1]
+        with self.assertTemplateNotUsed(cards.CARD_TEMPLATE):
+            self.assertEqual(cards.render_cards(posts)[0][1], first)
+        self.assertNotIn('Автор:', cards.render_cards(posts, False)[0][1])
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        posts = [Post.objects.get(pk=self.post.pk)]
+        self.assertIn('Комментариев: 1', cards.render_cards(posts)[0][1])
+
+    def test_card_from_stale_row_not_served_after_edit(self):
+        """Строка, прочитанная до правки, не кладет старый html под новую."""
+        stale = [Post.objects.get(pk=self.post.pk)]
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленный текст'
+        post.save()
+        cards.render_cards(stale)
+        fresh = [Post.objects.get(pk=self.post.pk)]
+        self.assertIn('Исправленный текст', cards.render_cards(fresh)[0][1])
+
+    def test_rename_refreshes_cards_and_feed(self):
+        """После переименования автора лента ведет на новый профиль."""
+        client = Client()
+        client.get(reverse('posts:index'))
+        user = User.objects.get(pk=self.user.pk)
+        user.username = 'Renamed'
+        user.save()
+        response = client.get(reverse('posts:index'))
+        self.assertContains(
+            response, reverse('posts:profile', args=['Renamed'])
+        )
+        self.assertNotContains(
+            response, reverse('posts:profile', args=['JustName'])
+        )
+
+
+class ConditionalGetTest(TestCase):
+    """Неизмененные ленты отдаются как 304 без рендера."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='JustName')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание группы',
+        )
+        cls.post = Post.objects.create(
+            text='Текст поста', author=cls.user, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feeds_answer_not_modified(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test_group'}),
+            reverse('posts:profile', kwargs={'username': 'JustName'}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                etag = response['ETag']
+                self.assertIn('no-cache', response['Cache-Control'])
+                with self.assertNumQueries(1):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_comment_and_login_change_etag(self):
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        user_client = Client()
+        user_client.force_login(self.user)
+        response = user_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_if_modified_since_alone_does_not_answer_304(self):
+        """Правка не двигает дату публикации, поэтому проверка только ETag."""
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        self.post.text = 'Исправленный текст'
+        self.post.save()
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        )
+        self.assertContains(response, 'Исправленный текст')
+
+
+class FollowGraphTest(TransactionTestCase):
+    """Кэш сбрасывается после коммита, поэтому тесты идут с транзакциями."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='Reader')
+        self.author = User.objects.create_user(username='Writer')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_follow_refreshes_cached_graph(self):
+        """Подписка и отписка видны в графе, теплый кэш не ходит в базу."""
+        graph.following_ids(self.user.pk)
+        graph.follower_count(self.author.pk)
+        self.client.get(reverse('posts:profile_follow', args=['Writer']))
+        self.assertTrue(graph.is_following(self.user, self.author))
+        self.assertEqual(graph.follower_count(self.author.pk), 1)
+        with self.assertNumQueries(0):
+            self.assertTrue(graph.is_following(self.user, self.author))
+        self.client.get(reverse('posts:profile_unfollow', args=['Writer']))
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(graph.is_following(self.user, self.author))
+        self.assertEqual(graph.follower_count(self.author.pk), 0)
+
+    def test_stale_cache_does_not_skip_writes(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        cache.set(graph.following_key(self.user.pk), frozenset())
+        self.client.get(reverse('posts:profile_unfollow', args=['Writer']))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_renamed_user_not_found_by_old_name(self):
+        self.assertEqual(graph.user_id('Writer'), self.author.pk)
+        self.author.username = 'Renamed'
+        self.author.save()
+        response = self.client.get(
+            reverse('posts:profile_follow', args=['Writer'])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_unknown_user_is_404(self):
+        response = self.client.get(
+            reverse('posts:profile_follow', args=['Nobody'])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_refreshes_follower_profile(self):
+        url = reverse('posts:profile', args=['Reader'])
+        self.assertContains(self.client.get(url), 'Подписок: 0')
+        self.client.get(reverse('posts:profile_follow', args=['Writer']))
+        self.assertContains(self.client.get(url), 'Подписок: 1')
+
+    def test_profile_shows_following_state(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.client.get(
+            reverse('posts:profile', args=['Writer'])
+        )
+        self.assertContains(response, 'Отписаться')
+
+    def test_follow_button_not_shared_through_page_cache(self):
+        """Кнопка подписки на закэшированном профиле своя у каждого."""
+        Follow.objects.create(user=self.user, author=self.author)
+        url = reverse('posts:profile', args=['Writer'])
+        self.assertContains(self.client.get(url), 'Отписаться')
+        response = Client().get(url)
+        self.assertNotContains(response, 'Отписаться')
+        writer = Client()
+        writer.force_login(self.author)
+        self.assertNotContains(writer.get(url), 'Подписаться')
+        other = Client()
+        other.force_login(User.objects.create_user(username='Other'))
+        self.assertContains(other.get(url), 'Подписаться')
+
+    def test_suggestions_not_shared_through_page_cache(self):
+        """Рекомендации автора на его профиле не видны другим."""
+        Suggestion.objects.create(
+            user=self.author,
+            author=User.objects.create_user(username='Other'),
+            score=1,
+        )
+        url = reverse('posts:profile', args=['Writer'])
+        writer = Client()
+        writer.force_login(self.author)
+        self.assertContains(writer.get(url), 'Кого почитать')
+        self.assertNotContains(self.client.get(url), 'Кого почитать')
+        self.assertNotContains(Client().get(url), 'Кого почитать')
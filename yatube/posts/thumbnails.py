@@ -0,0 +1,158 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import caching, images
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.THUMBNAIL_WORKERS,
+    thread_name_prefix='thumbnails',
+)
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+class BackgroundThumbnailBackend(ThumbnailBackend):
+    """
+    Не режет картинки во время рендера страницы. Если миниатюры еще нет
+    в хранилище ключей, ставит ее генерацию в пул и отдает исходник.
+    Новые загрузки получают копии для srcset в том же пуле (см.
+    schedule_variants), так что сюда попадают только старые картинки
+    без копий из {% thumbnail %}.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        source = ImageFile(file_)
+        self._set_default_options(source, options)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        cached = default.kvstore.get(ImageFile(name, default.storage))
+        if cached:
+            return cached
+        schedule(source.name, [(geometry_string, options)])
+        return source
+
+    def generate(self, file_, geometry_string, **options):
+        return super().get_thumbnail(file_, geometry_string, **options)
+
+    def _set_default_options(self, source, options):
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+
+
+def source_file(name):
+    # Хранилище входит в ключ миниатюры, поэтому берется то же, что у поля.
+    return ImageFile(name, Post._meta.get_field('image').storage)
+
+
+def thumbnail_name(source, geometry_string, options):
+    """Имя миниатюры, как его посчитает sorl: с параметрами по умолчанию."""
+    options = dict(options)
+    default.backend._set_default_options(source, options)
+    return default.backend._get_thumbnail_filename(
+        source, geometry_string, options
+    )
+
+
+def generate(name, geometries):
+    """Создает миниатюры картинки из хранилища Post.image."""
+    source = source_file(name)
+    for geometry_string, options in geometries:
+        default.backend.generate(source, geometry_string, **dict(options))
+
+
+def refresh_posts(name):
+    """Сбрасывает страницы и карточки, где вместо миниатюры был исходник."""
+    posts = Post.objects.filter(image=name)
+    posts.update(version=F('version') + 1)
+    for post_id, group_id, author_id in posts.values_list(
+        'pk', 'group_id', 'author_id'
+    ):
+        caching.invalidate_post(post_id, [group_id], [author_id])
+
+
+def make_variants(name):
+    """
+    Режет копии для srcset и записывает их ширины всем постам с этой
+    картинкой. Пост, у которого картинку успели сменить, не затронется.
+    """
+    post = Post.objects.filter(image=name).first()
+    if post is None:
+        return
+    widths = images.save_variants(post.image)
+    Post.objects.filter(image=name).update(image_widths=widths)
+    refresh_posts(name)
+
+
+def make_thumbnails(name, geometries):
+    generate(name, geometries)
+    refresh_posts(name)
+
+
+def _work(pending_keys, task, name, *args):
+    try:
+        task(name, *args)
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', name)
+    finally:
+        with _pending_lock:
+            _pending.difference_update(pending_keys)
+        connections.close_all()
+
+
+def schedule(name, geometries):
+    """
+    Ставит генерацию миниатюр в пул после фиксации транзакции. Повторы
+    отсекаются по имени миниатюры: другой размер той же картинки — это
+    другая задача.
+    """
+    source = source_file(name)
+    todo, thumbnail_names = [], []
+    with _pending_lock:
+        for geometry_string, options in geometries:
+            thumbnail = thumbnail_name(source, geometry_string, options)
+            if thumbnail in _pending:
+                continue
+            _pending.add(thumbnail)
+            todo.append((geometry_string, options))
+            thumbnail_names.append(thumbnail)
+    if todo:
+        transaction.on_commit(
+            lambda: _executor.submit(
+                _work, thumbnail_names, make_thumbnails, name, todo
+            )
+        )
+
+
+def schedule_variants(name):
+    """
+    Ставит копии для srcset в пул после фиксации транзакции. Если пул
+    не успел их сделать, их доделает rebuild_image_variants.
+    """
+    key = f'variants:{name}'
+    with _pending_lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+    transaction.on_commit(
+        lambda: _executor.submit(_work, [key], make_variants, name)
+    )
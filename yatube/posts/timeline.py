@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.db.models import Count
+
+from . import caching
+from .models import Follow, Post, TimelineEntry
+
+
+def trim(user_id):
+    """Оставляет в ленте пользователя не больше TIMELINE_DEPTH записей."""
+    overflow = TimelineEntry.objects.filter(user_id=user_id).order_by(
+        '-created', '-post'
+    ).values('pk')[settings.TIMELINE_DEPTH:]
+    TimelineEntry.objects.filter(pk__in=overflow).delete()
+
+
+def trim_all():
+    """
+    Обрезает все ленты, переросшие TIMELINE_DEPTH. Один GROUP BY находит
+    такие ленты, обрезаются только они. Возвращает число обрезанных лент.
+    """
+    user_ids = TimelineEntry.objects.order_by().values('user_id').annotate(
+        total=Count('pk')
+    ).filter(total__gt=settings.TIMELINE_DEPTH).values_list(
+        'user_id', flat=True
+    )
+    user_ids = list(user_ids)
+    for user_id in user_ids:
+        trim(user_id)
+    return len(user_ids)
+
+
+def fan_out(post):
+    """
+    Раскладывает новый пост по лентам подписчиков автора. Ленты здесь
+    не обрезаются: это был бы DELETE на каждого подписчика в запросе
+    публикации. Лишние записи убирает периодическая trim_timelines.
+    """
+    follower_ids = list(Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True))
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post=post, created=post.created)
+            for user_id in follower_ids
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика последние посты автора."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-created'
+    ).values_list('pk', 'created')[:settings.TIMELINE_DEPTH]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=post_id, created=created)
+            for post_id, created in posts
+        ],
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+    caching.bump(caching.timeline_scope(user_id))
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты подписчика посты автора."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        post__author_id=author_id,
+    ).delete()
+    caching.bump(caching.timeline_scope(user_id))
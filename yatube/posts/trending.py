@@ -0,0 +1,45 @@
+import math
+from datetime import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+# Точка отсчета шкалы. Вес события 2 ** ((t - EPOCH) / HOT_HALF_LIFE)
+# растет со временем, а не затухает: у всех постов «сейчас» одно и то же,
+# поэтому порядок по сумме весов совпадает с порядком по затухшим
+# оценкам, и хранимую оценку не нужно пересчитывать по часам.
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def event(moment):
+    """Логарифм веса события: время в периодах полураспада от EPOCH."""
+    return (moment - EPOCH).total_seconds() / settings.HOT_HALF_LIFE
+
+
+def initial_score():
+    """Оценка нового поста: одно событие — сама публикация."""
+    return event(timezone.now())
+
+
+def add(score, weight):
+    """log2(2 ** score + 2 ** weight) без переполнения."""
+    high, low = max(score, weight), min(score, weight)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def remove(score, weight, floor):
+    """
+    Обратное к add. Публикация поста из суммы не уходит, поэтому
+    оценка не опускается ниже floor — веса самой публикации.
+    """
+    if weight >= score:
+        return floor
+    return max(floor, score + math.log2(1 - 2 ** (weight - score)))
+
+
+def score(created, comment_moments):
+    """Оценка поста с нуля: по дате публикации и датам комментариев."""
+    result = event(created)
+    for moment in comment_moments:
+        result = add(result, event(moment))
+    return result
@@ -1,23 +1,61 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from core.routers import replica_reads
+from core.throttling import throttle
 
+from . import feeds, graph
+from .caching import (cache_versioned, comments_scopes, conditional,
+                      group_scopes, index_scopes, newest, post_detail_scopes,
+                      profile_scopes)
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post, User
+from .paginators import CountedPaginator, CursorPaginator
+from .search import SearchResults
+from .stats import get_group_stats, get_stats
+from .suggestions import get_suggestions
 
 
-def get_paginator(request, queryset=None):
+def get_paginator(request, queryset=None, key=('created', 'pk'), count=None):
     if queryset is None:
-        queryset = Post.objects.select_related('group', 'author')
-    paginator = Paginator(queryset, settings.PAGINATOR_CONST)
+        queryset = feeds.index_posts()
+    if settings.PAGINATOR_CURSOR_MODE:
+        paginator = CursorPaginator(queryset, settings.PAGINATOR_CONST, key)
+        return paginator.get_page(request.GET.get('cursor'))
+    if count is None:
+        paginator = Paginator(queryset, settings.PAGINATOR_CONST)
+    else:
+        paginator = CountedPaginator(
+            queryset, settings.PAGINATOR_CONST, count
+        )
     page_namber = request.GET.get('page')
     page_obj = paginator.get_page(page_namber)
     return page_obj
 
 
-@cache_page(20, key_prefix='index_page')
+def get_user_id(username):
+    author_id = graph.user_id(username)
+    if author_id is None:
+        raise Http404('Пользователь не найден')
+    return author_id
+
+
+def get_comments_page(request, post_id):
+    queryset = feeds.post_comments(post_id)
+    paginator = CursorPaginator(queryset, settings.COMMENTS_PAGE_SIZE)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@replica_reads
+@conditional(
+    lambda request: index_scopes(),
+    lambda request: newest(Post.objects.all()),
+    revalidate=True,
+)
+@cache_versioned(index_scopes)
 def index(request):
     context = {
         'page_obj': get_paginator(request),
@@ -26,39 +64,75 @@ def index(request):
     return render(request, template, context)
 
 
+@replica_reads
+@cache_versioned(index_scopes)
+def hot(request):
+    # Оценки меняются между запросами, поэтому курсор по оценке был бы
+    # неустойчив: лента листается по номерам страниц.
+    paginator = Paginator(feeds.hot_posts(), settings.PAGINATOR_CONST)
+    context = {
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    template = 'posts/hot.html'
+    return render(request, template, context)
+
+
+@replica_reads
+@conditional(
+    lambda request, slug: group_scopes(slug),
+    lambda request, slug: newest(Post.objects.filter(group__slug=slug)),
+    revalidate=True,
+)
+@cache_versioned(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    queryset = group.posts.select_related('author')
+    queryset = feeds.group_posts(group)
+    count = get_group_stats(group).posts_count
     context = {
         'group': group,
-        'page_obj': get_paginator(request, queryset),
+        'page_obj': get_paginator(request, queryset, count=count),
     }
     template = 'posts/group_list.html'
     return render(request, template, context)
 
 
+@replica_reads
+@conditional(
+    lambda request, username: profile_scopes(username),
+    lambda request, username: newest(
+        Post.objects.filter(author__username=username)
+    ),
+    revalidate=True,
+)
+@cache_versioned(profile_scopes)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
-    queryset = author.posts.select_related('group')
+    queryset = feeds.author_posts(author)
+    author_stats = get_stats(author)
     context = {
         'author': author,
-        'page_obj': get_paginator(request, queryset),
+        'author_stats': author_stats,
+        'page_obj': get_paginator(
+            request, queryset, count=author_stats.posts_count
+        ),
     }
-    if request.user.is_authenticated and Follow.objects.filter(
-            user__exact=request.user,
-            author__exact=author
-    ).exists():
-        context['following'] = True
+    if request.user == author:
+        context['suggestions'] = get_suggestions(request.user)
     template = 'posts/profile.html'
     return render(request, template, context)
 
 
+@replica_reads
+@cache_versioned(post_detail_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
-    comments = post.comments.select_related('author')
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id
+    )
+    comments = get_comments_page(request, post.id)
     comment_form = CommentForm()
     context = {
         'post': post,
+        'author_stats': get_stats(post.author),
         'comments': comments,
         'form': comment_form,
     }
@@ -66,7 +140,32 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = Paginator(SearchResults(query), settings.PAGINATOR_CONST)
+    context = {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+    }
+    template = 'posts/search.html'
+    return render(request, template, context)
+
+
+@cache_versioned(comments_scopes)
+def post_comments(request, post_id):
+    # Проверка идет только при промахе кэша: 404 в кэш не попадает.
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404('Пост не найден')
+    context = {
+        'post_id': post_id,
+        'comments': get_comments_page(request, post_id),
+    }
+    template = 'includes/posts/comment_list.html'
+    return render(request, template, context)
+
+
 @login_required
+@throttle('post_create', '5/m')
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -81,7 +180,8 @@ def post_create(request):
     if not form.is_valid():
         return render(request, template, context)
     form.instance.author = request.user
-    form.save()
+    with transaction.atomic():
+        form.save()
     return redirect('posts:profile', request.user.username)
 
 
@@ -97,7 +197,8 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        with transaction.atomic():
+            form.save()
         return redirect('posts:post_detail', post_id)
     context = {
         'form': form,
@@ -107,21 +208,27 @@ def post_edit(request, post_id):
 
 
 @login_required
+@throttle('add_comment', '20/m')
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
     if request.method == 'POST' and form.is_valid:
         form.instance.author = request.user
         form.instance.post = post
-        form.save()
+        with transaction.atomic():
+            form.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    queryset = Post.objects.filter(author__following__user__exact=request.user)
+    queryset = feeds.follow_posts(request.user)
+    if not graph.following_ids(request.user.pk):
+        queryset = queryset.none()
     context = {
-        'page_obj': get_paginator(request, queryset),
+        'page_obj': get_paginator(request, queryset, feeds.FOLLOW_KEY),
+        'suggestions': get_suggestions(request.user),
     }
     template = 'posts/follow.html'
     return render(request, template, context)
@@ -129,20 +236,23 @@ def follow_index(request):
 
 @login_required
 def profile_follow(request, username):
+    author_id = get_user_id(username)
     user = request.user
-    author = User.objects.get(username=username)
-    if user != author:
-        Follow.objects.get_or_create(
-            user=user,
-            author=author
-        )
+    if author_id != user.pk:
+        with transaction.atomic():
+            Follow.objects.get_or_create(
+                user=user,
+                author_id=author_id
+            )
     return redirect('posts:follow_index')
 
 
 @login_required
 def profile_unfollow(request, username):
-    Follow.objects.filter(
-        user=request.user,
-        author=User.objects.get(username=username)
-    ).delete()
+    author_id = get_user_id(username)
+    with transaction.atomic():
+        Follow.objects.filter(
+            user=request.user,
+            author_id=author_id
+        ).delete()
     return redirect('posts:follow_index')
@@ -24,12 +24,15 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.StickyPrimaryMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -42,7 +45,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -59,14 +62,50 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Потоки, в которых ASGI-точка входа выполняет представления.
+ASGI_THREADS = 8
+
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+        'CONN_MAX_AGE': 60,
+    },
+    # Локальная замена реплики: копия основной базы из sync_replica.
+    'replica': {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'db_replica.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# Алиасы, с которых читают ленты. Пустой список — все идет в default.
+DATABASE_REPLICAS = []
+
+# Сколько секунд после записи сессия читает только с основной базы.
+REPLICA_STICKY_SECONDS = 5
+
+# Переопределение лимитов core.throttling.throttle по имени области,
+# например {'add_comment': '10/m'}. Ведра жетонов хранятся в кэше.
+THROTTLE_RATES = {}
+
+THROTTLE_ENABLED = True
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -20000,
+    'mmap_size': 128 * 1024 * 1024,
+    'temp_store': 'memory',
 }
 
+SQLITE_IMMEDIATE_TRANSACTIONS = True
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -96,6 +135,8 @@ USE_TZ = True
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
@@ -115,6 +156,44 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 PAGINATOR_CONST = 10
 
+PAGINATOR_CURSOR_MODE = False
+
+COMMENTS_PAGE_SIZE = 20
+
+# Ленты длиннее обрезает периодическая команда trim_timelines.
+TIMELINE_DEPTH = 1000
+
+# Период полураспада веса комментария в ленте популярного, секунды.
+# После изменения нужно выполнить rebuild_hot_scores.
+HOT_HALF_LIFE = 6 * 60 * 60
+
+# Сколько секунд держать в кэше подписки и подписчиков пользователя.
+FOLLOW_GRAPH_TIMEOUT = 24 * 60 * 60
+
+# Сколько авторов предлагать в блоке «Кого почитать».
+SUGGESTIONS_COUNT = 5
+
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+
+THUMBNAIL_BACKEND = 'posts.thumbnails.BackgroundThumbnailBackend'
+THUMBNAIL_WORKERS = 2
+# Миниатюры шаблона {% thumbnail %} для старых картинок без копий srcset.
+POST_THUMBNAILS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+]
+
+# Прием картинок постов: пределы, формат хранения и ширины копий для srcset.
+IMAGE_MAX_BYTES = 10 * 1024 * 1024
+IMAGE_MAX_SIDE = 8000
+IMAGE_MASTER_WIDTH = 1920
+IMAGE_WIDTHS = (320, 640, 960)
+IMAGE_FORMAT = 'WEBP'
+IMAGE_QUALITY = 80
+# Картинку, загруженную повторно за столько секунд до освобождения,
+# не удаляем: ее пост может быть еще не закоммичен.
+IMAGE_RELEASE_GRACE = 60
+
 
 CACHES = {
     'default': {